@@ -1,4 +1,45 @@
+import os
+
 from setuptools import setup, find_packages
+from setuptools.command.build_py import build_py
+from setuptools.command.sdist import sdist
+
+
+def build_dictionary_bundle(required):
+    """
+    Compiles sitecomber_article_tests/data/dictionary.bundle from the NLTK
+    corpora, so installed hosts don't need them. Source distributions must
+    include it; other builds keep an existing bundle if the corpora are missing.
+    """
+    from sitecomber_article_tests.utils.dictionary import DICTIONARY_BUNDLE_PATH, build_dictionary_bundle
+
+    try:
+        print("building %s" % (build_dictionary_bundle()))
+    except (ImportError, LookupError) as e:
+        if required:
+            raise
+        if os.path.exists(DICTIONARY_BUNDLE_PATH):
+            print("warning: could not rebuild the dictionary bundle, keeping %s: %s" % (DICTIONARY_BUNDLE_PATH, e))
+        else:
+            print("warning: could not build the dictionary bundle, the NLTK corpora will be read at runtime: %s" % (e))
+
+
+class BuildPyWithBundle(build_py):
+
+    def run(self):
+        build_dictionary_bundle(required=False)
+        # Package data is globbed before the bundle exists on a fresh checkout
+        self.data_files = self._get_data_files()
+        build_py.run(self)
+
+
+class SdistWithBundle(sdist):
+
+    def run(self):
+        build_dictionary_bundle(required=True)
+        sdist.run(self)
+
+
 # this is a test
 setup(name='sitecomber-article-tests',
       description='Article related tests for Sitecomber',
@@ -8,9 +49,10 @@ setup(name='sitecomber-article-tests',
       author_email='nina@ninalp.com',
       license='MIT',
       packages=find_packages(),
-      package_data={'sitecomber_article_tests': ['*.py', '*.html', '*.css', '*.js', '*.jpg', '*.png']},
+      package_data={'sitecomber_article_tests': ['*.py', '*.html', '*.css', '*.js', '*.jpg', '*.png', 'benchmarks/corpus/*.html', 'data/*.bundle']},
       include_package_data=True,
-      install_requires=['newspaper3k', 'readtime', 'pyspellchecker', 'textsearch', 'contractions'],
+      cmdclass={'build_py': BuildPyWithBundle, 'sdist': SdistWithBundle},
+      install_requires=['newspaper3k', 'readtime', 'pyspellchecker', 'textsearch', 'contractions', 'pyahocorasick', 'lxml'],
       classifiers=[
           'Development Status :: 3 - Alpha',
           'Environment :: Web Environment',
@@ -0,0 +1,6 @@
+"""
+Throughput, latency and memory benchmarks for the article test analyzers.
+
+    python -m sitecomber_article_tests.benchmarks --save-baseline baseline.json
+    python -m sitecomber_article_tests.benchmarks --baseline baseline.json
+"""
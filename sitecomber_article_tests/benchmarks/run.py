@@ -0,0 +1,214 @@
+import os
+import sys
+import gc
+import json
+import time
+import platform
+import argparse
+import tracemalloc
+from collections import namedtuple
+
+from ..utils.article import get_article, text_analysis_cache
+from ..utils.executor import get_analyzer
+
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+
+BENCHMARK_FORMAT_VERSION = 1
+DEFAULT_ITERATIONS = 20
+DEFAULT_THRESHOLD = 0.25
+MULTI_MB_BYTES = 3 * 1024 * 1024
+
+Page = namedtuple('Page', ['url', 'last_text_content'])
+
+# (name, extra positional arguments, reads the parsed article), as run
+# through utils/executor.py
+ANALYZERS = [
+    ('reader_view', (), False),
+    ('placeholder_text', (['lorem', 'ipsum', 'tk'],), True),
+    ('read_time', (), True),
+    ('spelling', (), True),
+    ('meta_tags', (), False),
+    ('social_meta_tags', (), False),
+]
+
+
+def read_corpus_file(name):
+    with open(os.path.join(CORPUS_DIR, name), encoding='utf-8') as corpus_file:
+        return corpus_file.read()
+
+
+def build_multi_mb_page(html, size=MULTI_MB_BYTES):
+    """
+    Repeats the article body of html until the page is roughly size bytes
+    """
+    head, body = html.split(u"<main>", 1)
+    body, tail = body.split(u"</main>", 1)
+    copies = max(1, size // len(body))
+    return u"%s<main>%s</main>%s" % (head, body * copies, tail)
+
+
+def build_pathological_page():
+    """
+    Deep nesting, a huge unbroken token, dense url/number/acronym noise and
+    meta tags in the body, which defeats head-only meta extraction.
+    """
+    noise = u" ".join(
+        u"See http://example.com/a/%d or mail user%d@example.com, call 555-01%02d, ref NASA.%d lorem%d tk-%d." % (i, i, i % 100, i, i, i)
+        for i in range(2000)
+    )
+    nested = u"<div>" * 2000 + u"Deep text" + u"</div>" * 2000
+    late_meta = u"".join(u"<meta name=\"late%d\" content=\"%d\">" % (i, i) for i in range(500))
+    return (
+        u"<html><head><title>Pathological page</title></head><body><article>"
+        u"<h1>Pathological page</h1><p>%s</p><p>%s</p>%s%s</article></body></html>"
+    ) % (noise, u"x" * 200000, nested, late_meta)
+
+
+def load_fixtures():
+    """
+    Returns a list of (name, html, settings)
+    """
+    long_html = read_corpus_file('long.html')
+    return [
+        ('short', read_corpus_file('short.html'), {}),
+        ('long', long_html, {}),
+        ('multi_mb', build_multi_mb_page(long_html), {}),
+        ('spanish', read_corpus_file('spanish.html'), {'lang': 'es'}),
+        ('pathological', build_pathological_page(), {}),
+    ]
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def benchmark(analyzer_name, args, reads_article, name, html, settings, iterations):
+    """
+    Runs one analyzer against a fixture. Every iteration uses a new url, and
+    the content-keyed text analysis is cleared, so per-page caches miss as
+    they would during a crawl, while site-wide caches stay warm. One untimed
+    run first loads imports, corpora and spell checkers.
+
+    Pages share one parsed article between tests, so analyzers that read it
+    get it parsed untimed beforehand; the parse itself is measured by
+    reader_view. Peak memory is measured in a separate traced run, since
+    tracing skews timings.
+    """
+    analyzer = get_analyzer(analyzer_name)
+
+    def get_page(label):
+        page = Page(u"http://benchmark.invalid/%s/%s/%s" % (analyzer_name, name, label), html)
+        text_analysis_cache.clear()
+        if reads_article:
+            get_article(page, settings)
+        return page
+
+    analyzer(get_page('warmup'), settings, *args)
+
+    latencies = []
+    gc.collect()
+    for iteration in range(iterations):
+        page = get_page(iteration)
+        start = time.perf_counter()
+        analyzer(page, settings, *args)
+        latencies.append(time.perf_counter() - start)
+
+    page = get_page('traced')
+    tracemalloc.start()
+    analyzer(page, settings, *args)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'iterations': iterations,
+        'page_bytes': len(html.encode('utf-8')),
+        'pages_per_sec': iterations / sum(latencies),
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p90_ms': percentile(latencies, 0.9) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'peak_memory_kb': peak / 1024.0,
+    }
+
+
+def run_benchmarks(iterations=DEFAULT_ITERATIONS, analyzers=None, fixtures=None):
+    results = {}
+    for name, html, settings in load_fixtures():
+        if fixtures and name not in fixtures:
+            continue
+        for analyzer_name, args, reads_article in ANALYZERS:
+            if analyzers and analyzer_name not in analyzers:
+                continue
+            fixture_iterations = max(1, iterations // 10) if len(html) >= MULTI_MB_BYTES else iterations
+            results.setdefault(analyzer_name, {})[name] = benchmark(
+                analyzer_name, args, reads_article, name, html, settings, fixture_iterations
+            )
+
+    return {
+        'format': BENCHMARK_FORMAT_VERSION,
+        'environment': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+        },
+        'results': results,
+    }
+
+
+def compare_results(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Returns a list of regression messages: throughput more than threshold
+    below the baseline, or p90 latency or peak memory more than threshold
+    above it. Benchmarks missing from either side are ignored.
+    """
+    regressions = []
+    for analyzer_name, fixtures in baseline.get('results', {}).items():
+        for name, expected in fixtures.items():
+            actual = current['results'].get(analyzer_name, {}).get(name)
+            if actual is None:
+                continue
+            if actual['pages_per_sec'] < expected['pages_per_sec'] * (1 - threshold):
+                regressions.append(u"%s/%s: %.1f pages/sec, baseline %.1f" % (analyzer_name, name, actual['pages_per_sec'], expected['pages_per_sec']))
+            for key in ('p90_ms', 'peak_memory_kb'):
+                if actual[key] > expected[key] * (1 + threshold):
+                    regressions.append(u"%s/%s: %s %.1f, baseline %.1f" % (analyzer_name, name, key, actual[key], expected[key]))
+    return regressions
+
+
+def write_json(data, path):
+    with open(path, 'w') as output_file:
+        json.dump(data, output_file, indent=2, sort_keys=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m sitecomber_article_tests.benchmarks', description="Benchmark the article test analyzers.")
+    parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument('--analyzer', action='append', dest='analyzers', help="Only run this analyzer; may be repeated.")
+    parser.add_argument('--fixture', action='append', dest='fixtures', help="Only run this fixture; may be repeated.")
+    parser.add_argument('--output', help="Write results as JSON to this path instead of stdout.")
+    parser.add_argument('--baseline', help="Compare against results stored at this path and fail on regressions.")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help="Allowed relative change before a benchmark counts as a regression.")
+    parser.add_argument('--save-baseline', help="Store these results as the baseline at this path.")
+    options = parser.parse_args(argv)
+
+    results = run_benchmarks(options.iterations, options.analyzers, options.fixtures)
+
+    if options.output:
+        write_json(results, options.output)
+    else:
+        print(json.dumps(results, indent=2, sort_keys=True))
+
+    if options.save_baseline:
+        write_json(results, options.save_baseline)
+
+    if options.baseline:
+        with open(options.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare_results(results, baseline, options.threshold)
+        for regression in regressions:
+            sys.stderr.write(u"REGRESSION %s\n" % (regression))
+        if regressions:
+            return 1
+    return 0
@@ -1,20 +1,36 @@
 import logging
-import json
+from concurrent.futures.process import BrokenProcessPool
 
+from asgiref.sync import sync_to_async
 from django.apps import AppConfig
+from django.conf import settings as django_settings
+from django.db import transaction
 from sitecomber.apps.shared.interfaces import BaseSiteTest
 
-from .utils.article import is_reader_view_enabled, contains_placeholder_text, get_article_readtime
-from .utils.spelling import check_spelling
-from .utils.seo import has_meta_tags, has_socialmedia_tags
+from .utils.aio import run_analyzer_async
+from .utils.cache import get_content_hash
+from .utils.config import get_site_config
+from .utils.metrics import collect_page_timings, timer
+from .utils.payload import PAYLOAD_FULL, DEFAULT_EXCERPT_LENGTH, validate_payload_policy, dumps_payload
+from .utils.executor import AnalyzerError, run_analyzer, analyze_page, create_page_executor
 
 logger = logging.getLogger('django')
 class ArticleTestsConfig(AppConfig):
     name = 'sitecomber_article_tests.tests'
     label = 'sitecomber_article_tests'
+
+    def ready(self):
+        # Heavy dependencies load on first use unless warmed up at startup
+        if getattr(django_settings, 'SITECOMBER_ARTICLE_TESTS_WARM_UP', False):
+            from .utils.warmup import warm_up, format_report
+            report = warm_up(getattr(django_settings, 'SITECOMBER_ARTICLE_TESTS_LANGUAGES', ['en']))
+            logger.info(u"Article tests warm-up:\n%s" % (format_report(report)))
 default_app_config = 'sitecomber_article_tests.tests.ArticleTestsConfig'
 
 
+DEFAULT_BATCH_SIZE = 100
+
+
 def should_test_page(page):
     if not page.last_status_code:
         return False
@@ -25,11 +41,368 @@ def should_test_page(page):
     return True
 
 
-class ReaderViewTest(BaseSiteTest):
+def get_payload_policy():
+    return validate_payload_policy(getattr(django_settings, 'SITECOMBER_ARTICLE_TESTS_PAYLOAD', PAYLOAD_FULL))
+
+
+def get_excerpt_length():
+    return getattr(django_settings, 'SITECOMBER_ARTICLE_TESTS_EXCERPT_LENGTH', DEFAULT_EXCERPT_LENGTH)
+
+
+def dump_result_data(data):
+    try:
+        return dumps_payload(
+            data,
+            encoder=getattr(django_settings, 'SITECOMBER_ARTICLE_TESTS_JSON_ENCODER', 'json'),
+            compress_min_bytes=getattr(django_settings, 'SITECOMBER_ARTICLE_TESTS_COMPRESS_MIN_BYTES', None)
+        )
+    except Exception as e:
+        logger.error(u"Error dumping JSON data: %s: %s" % (data, e))
+    return None
+
+
+def save_page_test_result(page, test, status, message, data):
+    from sitecomber.apps.results.models import PageTestResult
+
+    with timer('results.save'):
+        r, created = PageTestResult.objects.get_or_create(
+            page=page,
+            test=test
+        )
+        r.message = message
+        r.status = status
+        dumped_data = dump_result_data(data)
+        if dumped_data is not None:
+            r.data = dumped_data
+        r.save()
+
+
+def should_force_rerun():
+    return getattr(django_settings, 'SITECOMBER_ARTICLE_TESTS_FORCE_RERUN', False)
+
+
+def should_collect_page_timings():
+    return getattr(django_settings, 'SITECOMBER_ARTICLE_TESTS_PAGE_TIMINGS', False)
+
+
+def add_page_timings(data, timings):
+    """
+    Attaches the milliseconds spent per stage to result data
+    """
+    data = dict(data or {})
+    data['timings'] = dict((name, round(seconds * 1000, 3)) for name, seconds in timings.items())
+    return data
+
+
+def add_fingerprint(data, fingerprint):
+    data = dict(data or {})
+    data['fingerprint'] = fingerprint
+    return data
+
+
+def has_current_result(page, test, fingerprint):
+    """
+    True if the stored result for page and test was produced from fingerprint
+    """
+    from sitecomber.apps.results.models import PageTestResult
+
+    return PageTestResult.objects.filter(page=page, test=test, data__contains=fingerprint).exists()
+
+
+def get_current_results(fingerprints):
+    """
+    Takes {(page pk, test): fingerprint} and returns the keys whose stored
+    result was produced from the same fingerprint, in one query. Fingerprints
+    are matched here rather than in the query, which would need one condition
+    per key.
+    """
+    from sitecomber.apps.results.models import PageTestResult
+
+    if not fingerprints:
+        return set()
+
+    stored_results = PageTestResult.objects.filter(
+        page__in=set(key[0] for key in fingerprints),
+        test__in=set(key[1] for key in fingerprints)
+    ).values_list('page_id', 'test', 'data')
+
+    current_results = set()
+    for page_pk, test, data in stored_results:
+        fingerprint = fingerprints.get((page_pk, test))
+        if fingerprint is not None and data and fingerprint in data:
+            current_results.add((page_pk, test))
+    return current_results
+
+
+def get_batch_size():
+    return getattr(django_settings, 'SITECOMBER_ARTICLE_TESTS_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+
+
+def flush_page_test_results(results, batch_size=None):
+    """
+    Persists a list of (page, test, status, message, data) results in one
+    transaction, updating existing PageTestResults in bulk and creating the rest.
+    """
+    from sitecomber.apps.results.models import PageTestResult
+
+    if not results:
+        return
+    batch_size = batch_size or get_batch_size()
+
+    with timer('results.flush'), transaction.atomic():
+        existing = {}
+        existing_results = PageTestResult.objects.select_for_update().filter(
+            page__in=set(result[0].pk for result in results),
+            test__in=set(result[1] for result in results)
+        )
+        for r in existing_results:
+            existing.setdefault((r.page_id, r.test), r)
+
+        to_update = {}
+        to_create = {}
+        for page, test, status, message, data in results:
+            key = (page.pk, test)
+            if key in existing:
+                r = to_update[key] = existing[key]
+            else:
+                r = to_create.get(key) or PageTestResult(page=page, test=test)
+                to_create[key] = r
+            r.message = message
+            r.status = status
+            dumped_data = dump_result_data(data)
+            if dumped_data is not None:
+                r.data = dumped_data
+
+        if to_update:
+            PageTestResult.objects.bulk_update(list(to_update.values()), ['message', 'status', 'data'], batch_size=batch_size)
+        if to_create:
+            PageTestResult.objects.bulk_create(list(to_create.values()), batch_size=batch_size)
+
+
+_page_executor = None
+
+
+def get_page_executor():
+    """
+    Returns the shared process pool if SITECOMBER_ARTICLE_TESTS_WORKERS is set,
+    otherwise None so pages are analyzed in-process.
+    """
+    global _page_executor
+    max_workers = getattr(django_settings, 'SITECOMBER_ARTICLE_TESTS_WORKERS', None)
+    if not max_workers:
+        return None
+    if _page_executor is None:
+        _page_executor = create_page_executor(
+            max_workers=max_workers,
+            max_tasks_per_child=getattr(django_settings, 'SITECOMBER_ARTICLE_TESTS_MAX_TASKS_PER_CHILD', None),
+            languages=getattr(django_settings, 'SITECOMBER_ARTICLE_TESTS_LANGUAGES', ['en'])
+        )
+    return _page_executor
+
+
+def reset_page_executor():
+    """
+    Shuts down the shared process pool; the next get_page_executor call
+    starts a new one
+    """
+    global _page_executor
+    if _page_executor is not None:
+        _page_executor.shutdown(wait=False)
+        _page_executor = None
+
+
+def get_page_results(pages, site_tests, executor=None, skip=()):
+    """
+    Yields (page, test, status, message, data) for each page and test, leaving
+    out the (page pk, test) keys in skip. With an executor, analysis is fanned
+    out to worker processes and only the result tuples come back.
+
+    A test that raises on a page is logged and left out, so the rest of the
+    batch is still saved. BrokenProcessPool is raised if a worker dies.
+    """
+    if executor is None:
+        for page in pages:
+            for site_test in site_tests:
+                if (page.pk, site_test.class_path) in skip:
+                    continue
+                try:
+                    status, message, data = site_test.get_page_result(page)
+                except Exception as e:
+                    logger.error(u"Error running %s on %s: %s: %s" % (site_test.class_path, page.url, e.__class__.__name__, e))
+                    continue
+                yield (page, site_test.class_path, status, message, data)
+        return
+
+    collect_timings = should_collect_page_timings()
+
+    futures = []
+    for page in pages:
+        page_tests = [site_test for site_test in site_tests if (page.pk, site_test.class_path) not in skip]
+        if not page_tests:
+            continue
+        analyses = [(site_test.analyzer, site_test.settings, site_test.get_analyzer_args()) for site_test in page_tests]
+        futures.append((page, page_tests, executor.submit(analyze_page, page.url, page.last_text_content, analyses, collect_timings)))
+
+    for page, page_tests, future in futures:
+        try:
+            page_results = future.result()
+        except BrokenProcessPool:
+            raise
+        except Exception as e:
+            logger.error(u"Error analyzing %s: %s: %s" % (page.url, e.__class__.__name__, e))
+            continue
+
+        for site_test, result in zip(page_tests, page_results):
+            if isinstance(result, AnalyzerError):
+                logger.error(u"Error running %s on %s: %s" % (site_test.class_path, page.url, result.error))
+                continue
+            try:
+                if collect_timings:
+                    result, timings = result
+                status, message, data = site_test.build_page_result(result)
+                if collect_timings:
+                    data = add_page_timings(data, timings)
+            except Exception as e:
+                logger.error(u"Error running %s on %s: %s: %s" % (site_test.class_path, page.url, e.__class__.__name__, e))
+                continue
+            yield (page, site_test.class_path, status, message, data)
+
+
+def process_pages(pages, site_tests, batch_size=None, executor=None, force=None):
+    """
+    Runs each of site_tests against pages, writing results in batches of
+    batch_size (SITECOMBER_ARTICLE_TESTS_BATCH_SIZE by default). Pages are
+    analyzed with executor, or the pool configured by
+    SITECOMBER_ARTICLE_TESTS_WORKERS, when one is available.
+
+    Tests whose stored result has a matching fingerprint are skipped unless
+    force (or SITECOMBER_ARTICLE_TESTS_FORCE_RERUN) is set.
+
+    If a worker of the shared pool dies, the batch it was analyzing is left
+    unsaved and the remaining batches go to a new pool.
+    """
+    batch_size = batch_size or get_batch_size()
+    shared_executor = executor is None
+    executor = executor or get_page_executor()
+    force = should_force_rerun() if force is None else force
+    pages = [page for page in pages if should_test_page(page)]
+
+    # Keep each batch at roughly batch_size results
+    pages_per_batch = max(1, batch_size // max(1, len(site_tests)))
+    for index in range(0, len(pages), pages_per_batch):
+        batch_pages = pages[index:index + pages_per_batch]
+
+        fingerprints = {}
+        for page in batch_pages:
+            content_hash = get_content_hash(page.last_text_content)
+            for site_test in site_tests:
+                fingerprints[(page.pk, site_test.class_path)] = site_test.get_fingerprint(page, content_hash)
+        skip = set() if force else get_current_results(fingerprints)
+
+        try:
+            results = [
+                (page, test, status, message, add_fingerprint(data, fingerprints[(page.pk, test)]))
+                for page, test, status, message, data in get_page_results(batch_pages, site_tests, executor, skip)
+            ]
+        except BrokenProcessPool as e:
+            if not shared_executor:
+                raise
+            logger.error(u"Worker process died analyzing %s: %s" % (u", ".join(page.url for page in batch_pages), e))
+            reset_page_executor()
+            executor = get_page_executor()
+            continue
+        flush_page_test_results(results, batch_size)
+
+
+class ArticleSiteTest(BaseSiteTest):
+    """
+    Shared page hook for the article tests. Subclasses name the analyzer
+    (see utils/executor.py) they run and turn its output into a
+    (status, message, data) result.
+
+    Bump version whenever a change to the test should invalidate results
+    stored for unchanged pages.
+    """
+    analyzer = None
+    version = 1
+
+    def get_analyzer_args(self):
+        return ()
+
+    def build_page_result(self, result):
+        raise NotImplementedError
+
+    def get_fingerprint(self, page, content_hash=None):
+        """
+        Hash of the page content, this test's settings, its analyzer
+        arguments (such as the payload policy) and its version
+        """
+        if content_hash is None:
+            content_hash = get_content_hash(page.last_text_content)
+        settings_key = get_site_config(self.settings).key
+        return get_content_hash(u"%s\n%s\n%s\n%r\n%s" % (self.class_path, self.version, settings_key, self.get_analyzer_args(), content_hash))
+
+    def get_page_result(self, page):
+        if not should_collect_page_timings():
+            result = run_analyzer(self.analyzer, page, self.settings, *self.get_analyzer_args())
+            return self.build_page_result(result)
+
+        with collect_page_timings() as timings:
+            result = run_analyzer(self.analyzer, page, self.settings, *self.get_analyzer_args())
+        status, message, data = self.build_page_result(result)
+        return status, message, add_page_timings(data, timings)
+
+    async def get_page_result_async(self, page, timeout=None):
+        collect_timings = should_collect_page_timings()
+        result = await run_analyzer_async(
+            self.analyzer, page, self.settings, *self.get_analyzer_args(),
+            timeout=timeout, collect_timings=collect_timings
+        )
+        if not collect_timings:
+            return self.build_page_result(result)
+
+        result, timings = result
+        status, message, data = self.build_page_result(result)
+        return status, message, add_page_timings(data, timings)
+
+    def on_page_parsed(self, page, force=None):
+        if not should_test_page(page):
+            return
+
+        fingerprint = self.get_fingerprint(page)
+        force = should_force_rerun() if force is None else force
+        if not force and has_current_result(page, self.class_path, fingerprint):
+            return
+
+        status, message, data = self.get_page_result(page)
+        save_page_test_result(page, self.class_path, status, message, add_fingerprint(data, fingerprint))
+
+    async def on_page_parsed_async(self, page, timeout=None, force=None):
+        """
+        Asyncio version of on_page_parsed; analysis runs in the executor
+        configured with utils.aio.configure()
+        """
+        if not should_test_page(page):
+            return
+
+        fingerprint = self.get_fingerprint(page)
+        force = should_force_rerun() if force is None else force
+        if not force and await sync_to_async(has_current_result)(page, self.class_path, fingerprint):
+            return
+
+        status, message, data = await self.get_page_result_async(page, timeout)
+        await sync_to_async(save_page_test_result)(page, self.class_path, status, message, add_fingerprint(data, fingerprint))
+
+
+class ReaderViewTest(ArticleSiteTest):
     """
     Determines if the page has a structured article
     Uses library https://github.com/codelucas/newspaper/
     """
+    analyzer = 'reader_view'
+
+    def get_analyzer_args(self):
+        return (get_payload_policy(), get_excerpt_length())
 
     def get_description_html(self):
 
@@ -40,34 +413,20 @@ class ReaderViewTest(BaseSiteTest):
     to extract the article content.</p>
         """
 
-    def on_page_parsed(self, page):
-        from sitecomber.apps.results.models import PageTestResult
-
-        if should_test_page(page):
+    def build_page_result(self, result):
+        reader_view_enabled, status, message, data = result
+        return status, message, data
 
-            reader_view_enabled, status, message, data = is_reader_view_enabled(page, self.settings)
 
-            r, created = PageTestResult.objects.get_or_create(
-                page=page,
-                test=self.class_path
-            )
-            r.message = message
-            r.status = status
-            try:
-                r.data = json.dumps(data, sort_keys=True, indent=2)
-            except Exception as e:
-                logger.error(u"Error dumping JSON data: %s: %s" % (data, e))
-            r.save()
-
-
-class PlaceholderTextTest(BaseSiteTest):
+class PlaceholderTextTest(ArticleSiteTest):
     """
     This test looks for lorem or ipsum or tk in main article body and title
     """
+    analyzer = 'placeholder_text'
 
     @property
     def placeholder_words(self):
-        return ['lorem', 'ipsum'] if 'placeholder_words' not in self.settings else self.settings['placeholder_words']
+        return get_site_config(self.settings).placeholder_words
 
     def get_description_html(self):
 
@@ -86,32 +445,23 @@ class PlaceholderTextTest(BaseSiteTest):
             </pre></small></p>
         """ % ('", "'.join(self.placeholder_words))
 
-    def on_page_parsed(self, page):
+    def get_analyzer_args(self):
+        return (self.placeholder_words,)
+
+    def build_page_result(self, result):
         from sitecomber.apps.results.models import PageTestResult
 
-        if should_test_page(page):
+        placeholder_text, message, data = result
+        status = PageTestResult.STATUS_SUCCESS if not placeholder_text else PageTestResult.STATUS_ERROR
+        return status, message, data
 
-            placeholder_text, message, data = contains_placeholder_text(page, self.settings, self.placeholder_words)
-            status = PageTestResult.STATUS_SUCCESS if not placeholder_text else PageTestResult.STATUS_ERROR
 
-            r, created = PageTestResult.objects.get_or_create(
-                page=page,
-                test=self.class_path
-            )
-            r.message = message
-            r.status = status
-            try:
-                r.data = json.dumps(data, sort_keys=True, indent=2)
-            except Exception as e:
-                logger.error(u"Error dumping JSON data: %s: %s" % (data, e))
-            r.save()
-
-
-class ArticleReadTimeInfo(BaseSiteTest):
+class ArticleReadTimeInfo(ArticleSiteTest):
     """
     Determines approximate read time based on library
     https://github.com/alanhamlett/readtime
     """
+    analyzer = 'read_time'
 
     def get_description_html(self):
 
@@ -119,31 +469,23 @@ class ArticleReadTimeInfo(BaseSiteTest):
     <p>See the <a href="https://github.com/alanhamlett/readtime">readtime library</a> for more details.</p>
         """
 
-    def on_page_parsed(self, page):
+    def build_page_result(self, result):
         from sitecomber.apps.results.models import PageTestResult
 
-        if should_test_page(page):
-
-            message, data = get_article_readtime(page, self.settings)
-
-            r, created = PageTestResult.objects.get_or_create(
-                page=page,
-                test=self.class_path
-            )
-            r.message = message
-            r.status = PageTestResult.STATUS_INFO
-            try:
-                r.data = json.dumps(data, sort_keys=True, indent=2)
-            except Exception as e:
-                logger.error(u"Error dumping JSON data: %s: %s" % (data, e))
-            r.save()
+        message, data = result
+        status = PageTestResult.STATUS_INFO
+        return status, message, data
 
 
-class SpellCheckTest(BaseSiteTest):
+class SpellCheckTest(ArticleSiteTest):
     """
     Check spelling using pyspellchecker
     See https://github.com/barrust/pyspellchecker
     """
+    analyzer = 'spelling'
+
+    def get_analyzer_args(self):
+        return (get_payload_policy(),)
 
     def get_description_html(self):
 
@@ -167,28 +509,15 @@ class SpellCheckTest(BaseSiteTest):
             </pre></small></p>
         """
 
-    def on_page_parsed(self, page):
+    def build_page_result(self, result):
         from sitecomber.apps.results.models import PageTestResult
-        if should_test_page(page):
 
-            contains_misspellings, message, data = check_spelling(page, self.settings)
-            status = PageTestResult.STATUS_SUCCESS if not contains_misspellings else PageTestResult.STATUS_WARNING
+        contains_misspellings, message, data = result
+        status = PageTestResult.STATUS_SUCCESS if not contains_misspellings else PageTestResult.STATUS_WARNING
+        return status, message, data
 
-            r, created = PageTestResult.objects.get_or_create(
-                page=page,
-                test=self.class_path
-            )
-            r.message = message
-            r.status = status
-            try:
-                r.data = json.dumps(data, sort_keys=True, indent=2)
-            except Exception as e:
-                logger.error(u"Error dumping JSON data: %s: %s" % (data, e))
-            r.save()
 
-
-
-class SEOMetaTagsTest(BaseSiteTest):
+class SEOMetaTagsTest(ArticleSiteTest):
     """
     Determines if the page has the recommended meta tags:
     Content-Type, Title, Desciption, and Viewport
@@ -198,6 +527,7 @@ class SEOMetaTagsTest(BaseSiteTest):
 
     Follows https://moz.com/blog/the-ultimate-guide-to-seo-meta-tags
     """
+    analyzer = 'meta_tags'
 
     def get_description_html(self):
 
@@ -208,30 +538,17 @@ do not affect whether the test is passing or failing.</p>
 <p>This test follows recommendations by <a href="https://moz.com/blog/the-ultimate-guide-to-seo-meta-tags">Moz.com</a></p>
         """
 
-    def on_page_parsed(self, page):
-        from sitecomber.apps.results.models import PageTestResult
+    def build_page_result(self, result):
+        has_required_meta_tags, status, message, data = result
+        return status, message, data
 
-        if should_test_page(page):
 
-            has_required_meta_tags, status, message, data = has_meta_tags(page, self.settings)
-
-            r, created = PageTestResult.objects.get_or_create(
-                page=page,
-                test=self.class_path
-            )
-            r.message = message
-            r.status = status
-            try:
-                r.data = json.dumps(data, sort_keys=True, indent=2)
-            except Exception as e:
-                logger.error(u"Error dumping JSON data: %s: %s" % (data, e))
-            r.save()
-
-class SocialMetaTagsTest(BaseSiteTest):
+class SocialMetaTagsTest(ArticleSiteTest):
     """
     Determines if the page has the recommended social meta tags per
     https://moz.com/blog/meta-data-templates-123
     """
+    analyzer = 'social_meta_tags'
 
     def get_description_html(self):
 
@@ -239,21 +556,6 @@ class SocialMetaTagsTest(BaseSiteTest):
 tags per <a href="https://moz.com/blog/meta-data-templates-123">Moz.com</a></p>
         """
 
-    def on_page_parsed(self, page):
-        from sitecomber.apps.results.models import PageTestResult
-
-        if should_test_page(page):
-
-            has_social_tags, status, message, data = has_socialmedia_tags(page, self.settings)
-
-            r, created = PageTestResult.objects.get_or_create(
-                page=page,
-                test=self.class_path
-            )
-            r.message = message
-            r.status = status
-            try:
-                r.data = json.dumps(data, sort_keys=True, indent=2)
-            except Exception as e:
-                logger.error(u"Error dumping JSON data: %s: %s" % (data, e))
-            r.save()
+    def build_page_result(self, result):
+        has_social_tags, status, message, data = result
+        return status, message, data
@@ -0,0 +1,117 @@
+import time
+import asyncio
+import threading
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+
+from ..utils import aio
+from .fakes import FakePage
+
+
+class FakeAnalyzePage(object):
+    """
+    Stands in for executor.analyze_page, sleeping for settings['delay'] and
+    recording how many analyses run at once
+    """
+
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, url, html, analyses, collect_timings=False):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            name, settings, args = analyses[0]
+            time.sleep(settings.get('delay', 0))
+            return [(name, url, args)]
+        finally:
+            with self.lock:
+                self.running -= 1
+
+
+async def run_all(page):
+    return await asyncio.gather(*[
+        aio.run_analyzer_async('read_time', page, {'delay': 0.05}, index) for index in range(6)
+    ])
+
+
+async def run_after_timeouts(page):
+
+    async def time_out(index):
+        try:
+            return await aio.run_analyzer_async('read_time', page, {'delay': 0.3}, index, timeout=0.05)
+        except asyncio.TimeoutError:
+            return None
+
+    return await asyncio.gather(
+        time_out(0), time_out(1),
+        aio.run_analyzer_async('read_time', page, {'delay': 0.05}, 2),
+        aio.run_analyzer_async('read_time', page, {'delay': 0.05}, 3),
+    )
+
+
+async def run_wrappers(page):
+    return await asyncio.gather(
+        aio.is_reader_view_enabled_async(page, {}),
+        aio.contains_placeholder_text_async(page, {}, [u"lorem"]),
+        aio.get_article_readtime_async(page, {}),
+        aio.check_spelling_async(page, {}),
+        aio.has_meta_tags_async(page, {}),
+        aio.has_socialmedia_tags_async(page, {}),
+    )
+
+
+def test():
+
+    print("Test async analyzers...")
+    page = FakePage(1)
+    analyze_page = FakeAnalyzePage()
+    executor = ThreadPoolExecutor(max_workers=8)
+    try:
+        with mock.patch.object(aio, 'analyze_page', analyze_page):
+            aio.configure(executor=executor, max_concurrency=2)
+
+            results = asyncio.run(run_all(page))
+            if [result[2] for result in results] != [(index,) for index in range(6)]:
+                raise Exception("Async analyzers returned unexpected results. \nReceieved '%s' " % (results))
+            if analyze_page.max_running != 2:
+                raise Exception("Async analyzers should be limited by the semaphore. \nExpected 2 \nReceieved %s " % (analyze_page.max_running))
+
+            # Analyses that timed out keep their slot until they finish
+            analyze_page.max_running = 0
+            results = asyncio.run(run_after_timeouts(page))
+            if results[:2] != [None, None] or analyze_page.max_running != 2:
+                raise Exception("Timed out analyses should hold the semaphore until they finish. \nExpected 2 \nReceieved %s " % (analyze_page.max_running))
+
+            try:
+                asyncio.run(aio.run_analyzer_async('read_time', page, {'delay': 0.5}, timeout=0.05))
+            except asyncio.TimeoutError:
+                pass
+            else:
+                raise Exception("Async analyzer did not time out.")
+
+            # The configured timeout applies when none is passed
+            aio.configure(executor=executor, timeout=0.05)
+            try:
+                asyncio.run(aio.run_analyzer_async('read_time', page, {'delay': 0.5}))
+            except asyncio.TimeoutError:
+                pass
+            else:
+                raise Exception("Async analyzer did not use the configured timeout.")
+
+            aio.configure(executor=executor)
+            expected_calls = [
+                ('reader_view', ()), ('placeholder_text', ([u"lorem"],)), ('read_time', ()),
+                ('spelling', ()), ('meta_tags', ()), ('social_meta_tags', ()),
+            ]
+            actual_calls = [(name, args) for name, url, args in asyncio.run(run_wrappers(page))]
+            if expected_calls != actual_calls:
+                raise Exception("Async wrappers ran unexpected analyzers. \nExpected '%s' \nReceieved '%s' " % (expected_calls, actual_calls))
+    finally:
+        aio.configure()
+        executor.shutdown()
+
+    print("Done testing async analyzers!")
@@ -0,0 +1,30 @@
+from collections import namedtuple
+
+from ..utils.article import get_article, get_article_cache_info, clear_article_cache
+
+
+Page = namedtuple('Page', ['url', 'last_text_content'])
+
+
+def test():
+
+    print("Test article cache...")
+    clear_article_cache()
+    html = u"<html><head><title>Cache Test</title></head><body><article><h1>Cache Test</h1><p>%s</p></article></body></html>" % (u"This is a sentence about caching. " * 20)
+    page = Page(url=u"http://www.example.com/article/", last_text_content=html)
+
+    first = get_article(page, {})
+    second = get_article(page, {})
+    if first is not second:
+        raise Exception("Article cache returned a different article for identical page content.")
+
+    changed_page = page._replace(last_text_content=html.replace(u"caching", u"parsing"))
+    third = get_article(changed_page, {})
+    if third is first:
+        raise Exception("Article cache returned a stale article for changed page content.")
+
+    info = get_article_cache_info()
+    if info['hits'] != 1 or info['misses'] != 2:
+        raise Exception("Article cache got unexpected counters. \nExpected 1 hit and 2 misses \nReceieved '%s' " % (info))
+
+    print("Done testing article cache!")
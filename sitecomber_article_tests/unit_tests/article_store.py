@@ -0,0 +1,81 @@
+import os
+import sqlite3
+import tempfile
+from datetime import datetime
+
+from ..utils.article_store import ACCESS_REFRESH_SECONDS, ArticleStore, StoredArticle
+
+
+def get_article(index, text_length=1000):
+    return StoredArticle(
+        title=u"Article %s" % (index),
+        text=u"x" * text_length,
+        authors=[u"Jane Doe"],
+        publish_date=datetime(2020, 1, 2, 3, 4, 5),
+        top_image=u"http://www.example.com/top.jpg",
+        imgs=[u"http://www.example.com/top.jpg", u"http://www.example.com/a.jpg"]
+    )
+
+
+def test():
+
+    print("Test article store...")
+    path = os.path.join(tempfile.mkdtemp(), u"articles.sqlite3")
+
+    store = ArticleStore(path, version=u"1")
+    article = get_article(0)
+    store.set(u"digest", u"en", article)
+    stored = store.get(u"digest", u"en")
+    if stored is None or stored.to_json() != article.to_json():
+        raise Exception("Stored article did not round trip. \nReceieved '%s' " % (None if stored is None else stored.to_json()))
+    if store.get(u"digest", u"es") is not None:
+        raise Exception("Stored article should be keyed by language.")
+    store.close()
+
+    # Opening the store with a new extractor version purges stale entries
+    store = ArticleStore(path, version=u"2")
+    if store.get(u"digest", u"en") is not None or store.get_total_bytes() != 0:
+        raise Exception("Entries from an old extractor version were not purged.")
+    store.close()
+
+    # Stores sharing one file stay within the budget together
+    max_bytes = 20000
+    stores = [ArticleStore(path, max_bytes=max_bytes, version=u"2") for i in range(2)]
+    for index in range(40):
+        stores[index % 2].set(u"digest-%s" % (index), u"en", get_article(index))
+    total_bytes = stores[0].get_total_bytes()
+    if total_bytes > max_bytes:
+        raise Exception("Article store exceeded its budget. \nExpected at most %s \nReceieved %s " % (max_bytes, total_bytes))
+    if stores[1].get(u"digest-39", u"en") is None or stores[0].get(u"digest-0", u"en") is not None:
+        raise Exception("Article store should evict the least recently used entries first.")
+    for store in stores:
+        store.close()
+
+    # Hits only refresh access times that are older than the refresh interval
+    store = ArticleStore(path, version=u"2")
+    store.set(u"digest", u"en", article)
+    connection = sqlite3.connect(path)
+    accessed_at = connection.execute("SELECT accessed_at FROM articles WHERE digest = 'digest'").fetchone()[0]
+    store.get(u"digest", u"en")
+    if connection.execute("SELECT accessed_at FROM articles WHERE digest = 'digest'").fetchone()[0] != accessed_at:
+        raise Exception("Article store hit should not rewrite a recent access time.")
+    connection.execute("UPDATE articles SET accessed_at = ? WHERE digest = 'digest'", (accessed_at - ACCESS_REFRESH_SECONDS - 1,))
+    connection.commit()
+    store.get(u"digest", u"en")
+    if connection.execute("SELECT accessed_at FROM articles WHERE digest = 'digest'").fetchone()[0] < accessed_at:
+        raise Exception("Article store hit should refresh an old access time.")
+    connection.close()
+    store.close()
+
+    # Unusable files behave as a miss instead of failing the tests
+    corrupt_path = os.path.join(tempfile.mkdtemp(), u"corrupt.sqlite3")
+    with open(corrupt_path, 'wb') as f:
+        f.write(b"not a database" * 100)
+    for broken_path in [corrupt_path, os.path.join(tempfile.mkdtemp(), u"missing", u"articles.sqlite3")]:
+        store = ArticleStore(broken_path)
+        store.set(u"digest", u"en", article)
+        if store.get(u"digest", u"en") is not None:
+            raise Exception("Unusable article store should behave as a miss. \nReceieved '%s' " % (broken_path))
+        store.close()
+
+    print("Done testing article store!")
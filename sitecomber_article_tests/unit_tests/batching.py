@@ -0,0 +1,140 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from unittest import mock
+
+from .fakes import FakePage, FakePageTestResult, configure_django, fake_results
+
+
+class FakeSiteTest(object):
+    analyzer = 'fake'
+
+    def __init__(self, name, failing_page=None):
+        self.class_path = u"fake.%s" % (name)
+        self.settings = {}
+        self.failing_page = failing_page
+
+    def get_analyzer_args(self):
+        return ()
+
+    def get_page_result(self, page):
+        if page.pk == self.failing_page:
+            raise ValueError(u"Broken page")
+        return u"success", u"Checked %s" % (page.pk), {'page': page.pk}
+
+    def build_page_result(self, result):
+        return result
+
+    def get_fingerprint(self, page, content_hash=None):
+        return u"%s:%s" % (self.class_path, page.pk)
+
+
+def analyze_or_die(url, html, analyses, collect_timings=False):
+    # Runs in a worker process; page 2 takes the worker down with it
+    if url.endswith(u"/2/"):
+        os._exit(1)
+    return [(u"success", u"Checked", {}) for analysis in analyses]
+
+
+def test():
+
+    print("Test batched page processing...")
+    configure_django()
+    from .. import tests
+
+    site_tests = [FakeSiteTest(u"a"), FakeSiteTest(u"b")]
+    pages = [FakePage(pk) for pk in range(1, 6)]
+
+    skip = set([(1, u"fake.a"), (2, u"fake.b")])
+    results = list(tests.get_page_results(pages[:2], site_tests, skip=skip))
+    expected_keys = [(1, u"fake.b"), (2, u"fake.a")]
+    actual_keys = [(page.pk, test) for page, test, status, message, data in results]
+    if expected_keys != actual_keys:
+        raise Exception("Page results did not skip current results. \nExpected '%s' \nReceieved '%s' " % (expected_keys, actual_keys))
+    if results[0][2:] != (u"success", u"Checked 1", {'page': 1}):
+        raise Exception("Page results did not keep the test's result. \nReceieved '%s' " % (results[0],))
+
+    # A test that raises is logged and left out; the rest of the batch is kept
+    failing_tests = [FakeSiteTest(u"a"), FakeSiteTest(u"b", failing_page=2)]
+    with mock.patch.object(tests.logger, 'error') as log_error:
+        results = list(tests.get_page_results(pages[:3], failing_tests))
+    expected_keys = [(1, u"fake.a"), (1, u"fake.b"), (2, u"fake.a"), (3, u"fake.a"), (3, u"fake.b")]
+    actual_keys = [(page.pk, test) for page, test, status, message, data in results]
+    if expected_keys != actual_keys or log_error.call_count != 1:
+        raise Exception("A failing test should only lose its own result. \nExpected '%s' \nReceieved '%s' " % (expected_keys, actual_keys))
+
+    # Likewise for analyzers that raise in a worker
+    def analyze_page(url, html, analyses, collect_timings=False):
+        if url.endswith(u"/2/"):
+            return [(u"success", u"Checked", {}), tests.AnalyzerError(u"fake", u"ValueError: Broken page")]
+        return [(u"success", u"Checked", {}) for analysis in analyses]
+
+    with ThreadPoolExecutor(1) as executor, mock.patch.object(tests, 'analyze_page', analyze_page), mock.patch.object(tests.logger, 'error') as log_error:
+        results = list(tests.get_page_results(pages[:3], failing_tests, executor=executor))
+    actual_keys = [(page.pk, test) for page, test, status, message, data in results]
+    if expected_keys != actual_keys or log_error.call_count != 1:
+        raise Exception("A failing analyzer should only lose its own result. \nExpected '%s' \nReceieved '%s' " % (expected_keys, actual_keys))
+
+    from ..utils.executor import AnalyzerError, analyze_page
+    page_results = analyze_page(pages[0].url, pages[0].last_text_content, [(u"missing", {}, ())])
+    if not isinstance(page_results[0], AnalyzerError) or not page_results[0].error.startswith(u"KeyError"):
+        raise Exception("Workers should return errors in place of results. \nReceieved '%s' " % (page_results,))
+
+    # A worker dying breaks the shared pool: its batch is dropped and the
+    # following batches go to a new pool
+    from django.test import override_settings
+
+    flushed = []
+    pools = []
+
+    def create_page_executor(**kwargs):
+        pools.append(ProcessPoolExecutor(1))
+        return pools[-1]
+
+    with override_settings(SITECOMBER_ARTICLE_TESTS_WORKERS=1), \
+            mock.patch.object(tests, 'create_page_executor', create_page_executor), \
+            mock.patch.object(tests, 'analyze_page', analyze_or_die), \
+            mock.patch.object(tests, 'flush_page_test_results', lambda results, batch_size=None: flushed.append(results)), \
+            mock.patch.object(tests.logger, 'error') as log_error:
+        try:
+            tests.process_pages(pages[:3], site_tests[:1], batch_size=1, force=True)
+        finally:
+            tests.reset_page_executor()
+
+    actual_batches = [[page.pk for page, test, status, message, data in batch] for batch in flushed]
+    if actual_batches != [[1], [3]] or len(pools) != 2 or log_error.call_count != 1:
+        raise Exception("A dead worker should only lose its own batch. \nExpected '%s' \nReceieved '%s' with %s pools" % ([[1], [3]], actual_batches, len(pools)))
+
+    # Batches of 5 results across 2 tests hold 2 pages each; the non-HTML page is left out
+    flushed = []
+    flush_page_test_results = tests.flush_page_test_results
+    tests.flush_page_test_results = lambda results, batch_size=None: flushed.append(results)
+    try:
+        tests.process_pages(pages + [FakePage(6, last_content_type=u"image/png")], site_tests, batch_size=5, executor=None, force=True)
+    finally:
+        tests.flush_page_test_results = flush_page_test_results
+
+    expected_batches = [[1, 1, 2, 2], [3, 3, 4, 4], [5, 5]]
+    actual_batches = [[page.pk for page, test, status, message, data in batch] for batch in flushed]
+    if expected_batches != actual_batches:
+        raise Exception("Pages were not processed in batches. \nExpected '%s' \nReceieved '%s' " % (expected_batches, actual_batches))
+    for page, test, status, message, data in flushed[0]:
+        if data.get('fingerprint') != u"%s:%s" % (test, page.pk):
+            raise Exception("Batched results are missing their fingerprint. \nReceieved '%s' " % (data))
+
+    # Existing results are updated in bulk, the rest created, one per page and test
+    existing = FakePageTestResult(pages[0], u"fake.a")
+    with fake_results([existing]) as queryset:
+        tests.flush_page_test_results([
+            (pages[0], u"fake.a", u"error", u"Updated", {'a': 1}),
+            (pages[0], u"fake.b", u"success", u"Created", {'b': 1}),
+            (pages[0], u"fake.b", u"warning", u"Created again", {'b': 2}),
+        ], batch_size=50)
+
+    updated, fields, batch_size = queryset.updated
+    created, create_batch_size = queryset.created
+    if updated != [existing] or existing.message != u"Updated" or existing.data != u'{"a":1}' or batch_size != 50:
+        raise Exception("Existing result was not updated in bulk. \nReceieved '%s' " % (queryset.updated,))
+    if len(created) != 1 or created[0].message != u"Created again" or created[0].test != u"fake.b":
+        raise Exception("New results should be created once per page and test. \nReceieved '%s' " % ([(r.test, r.message) for r in created],))
+
+    print("Done testing batched page processing!")
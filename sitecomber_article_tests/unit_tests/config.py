@@ -0,0 +1,37 @@
+import os
+import sys
+import subprocess
+
+from ..utils.config import get_site_config
+
+
+def test():
+
+    print("Test site config...")
+    settings = {"lang": "xx", "placeholder_words": ["tbd"], "known_words": ["cheesemonger"]}
+    config = get_site_config(settings)
+
+    if config.language != "en":
+        raise Exception("Unsupported language should fall back to 'en'. \nReceieved '%s' " % (config.language))
+    if "cheesemonger" not in config.dictionary:
+        raise Exception("Site dictionary is missing the site's known words.")
+    if config.placeholder_matcher.find(u"Section TBD.") != [u"TBD"]:
+        raise Exception("Placeholder matcher does not use the site's placeholder words.")
+
+    if get_site_config(dict(settings)) is not config:
+        raise Exception("Identical settings should share one compiled config.")
+
+    changed_settings = dict(settings, known_words=["gadzooks"])
+    changed_config = get_site_config(changed_settings)
+    if changed_config is config or "gadzooks" not in changed_config.dictionary:
+        raise Exception("Changed settings should compile a new config.")
+
+    # Loading the tests' configuration must not import the analyzers' dependencies
+    loaded_modules = subprocess.check_output([sys.executable, "-c", (
+        "import sys; import sitecomber_article_tests.utils.config; "
+        "print(' '.join(name for name in ('spellchecker', 'nltk', 'newspaper') if name in sys.modules))"
+    )], cwd=os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))).decode('utf-8').strip()
+    if loaded_modules:
+        raise Exception("Site config imported heavy dependencies. \nReceieved '%s' " % (loaded_modules))
+
+    print("Done testing site config!")
@@ -0,0 +1,123 @@
+"""
+Stand-ins for sitecomber's pages and PageTestResult model, so the site test
+hooks in tests.py can be tested without a crawl or a results table.
+"""
+import importlib
+import sys
+import types
+from contextlib import contextmanager
+from unittest import mock
+
+
+class FakeBaseSiteTest(object):
+
+    def __init__(self, site, settings):
+        self.site = site
+        self.settings = settings
+
+    @property
+    def class_path(self):
+        return u"%s.%s" % (self.__module__, self.__class__.__name__)
+
+
+def install_sitecomber_interfaces():
+    """
+    Provides sitecomber.apps.shared.interfaces.BaseSiteTest when sitecomber
+    itself is not installed
+    """
+    try:
+        importlib.import_module('sitecomber.apps.shared.interfaces')
+        return
+    except ImportError:
+        pass
+
+    for name in ['sitecomber', 'sitecomber.apps', 'sitecomber.apps.shared', 'sitecomber.apps.shared.interfaces']:
+        if name not in sys.modules:
+            module = sys.modules[name] = types.ModuleType(name)
+            module.__path__ = []
+    sys.modules['sitecomber.apps.shared.interfaces'].BaseSiteTest = FakeBaseSiteTest
+
+
+def configure_django():
+    """
+    Minimal settings for importing tests.py outside a sitecomber project;
+    transactions run against an in-memory SQLite database with no tables
+    """
+    from django.conf import settings
+
+    if not settings.configured:
+        settings.configure(DATABASES={'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}})
+    install_sitecomber_interfaces()
+
+
+class FakePage(object):
+
+    def __init__(self, pk, last_text_content=u"<html><body><p>Page</p></body></html>", last_content_type=u"text/html"):
+        self.pk = pk
+        self.url = u"http://www.example.com/%s/" % (pk)
+        self.last_text_content = last_text_content
+        self.last_status_code = 200
+        self.is_internal = True
+        self.last_content_type = last_content_type
+
+
+class FakeQuerySet(object):
+    """
+    Records each filter call and returns the rows it was given
+    """
+
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.filters = []
+
+    def select_for_update(self):
+        return self
+
+    def filter(self, *args, **kwargs):
+        self.filters.append((args, kwargs))
+        return self
+
+    def values_list(self, *fields):
+        return list(self.rows)
+
+    def exists(self):
+        return bool(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        self.updated = (list(objs), fields, batch_size)
+
+    def bulk_create(self, objs, batch_size=None):
+        self.created = (list(objs), batch_size)
+
+
+class FakePageTestResult(object):
+    STATUS_SUCCESS = 'success'
+    STATUS_INFO = 'info'
+    STATUS_WARNING = 'warning'
+    STATUS_ERROR = 'error'
+
+    objects = None
+
+    def __init__(self, page=None, test=None):
+        self.page = page
+        self.page_id = None if page is None else page.pk
+        self.test = test
+        self.message = None
+        self.status = None
+        self.data = None
+
+
+@contextmanager
+def fake_results(rows=()):
+    """
+    Replaces sitecomber's results models while active; yields the queryset
+    that every PageTestResult.objects call goes through
+    """
+    queryset = FakeQuerySet(rows)
+    models = types.ModuleType('sitecomber.apps.results.models')
+    models.PageTestResult = type('PageTestResult', (FakePageTestResult,), {'objects': queryset})
+    with mock.patch.dict(sys.modules, {'sitecomber.apps.results.models': models}):
+        yield queryset
@@ -0,0 +1,78 @@
+from unittest import mock
+
+from ..utils.payload import PAYLOAD_SUMMARY, dumps_payload, loads_payload
+from .fakes import FakePage, configure_django, fake_results
+
+
+def test():
+
+    print("Test result fingerprints...")
+    configure_django()
+    from .. import tests
+
+    page = FakePage(1, u"<html><body><p>First version</p></body></html>")
+    changed_page = FakePage(1, u"<html><body><p>Second version</p></body></html>")
+    site_test = tests.PlaceholderTextTest(None, {"placeholder_words": ["lorem"]})
+    fingerprint = site_test.get_fingerprint(page)
+
+    if tests.PlaceholderTextTest(None, {"placeholder_words": ["lorem"]}).get_fingerprint(page) != fingerprint:
+        raise Exception("Fingerprint should only depend on the test, its settings and the content.")
+    if site_test.get_fingerprint(page, tests.get_content_hash(page.last_text_content)) != fingerprint:
+        raise Exception("Fingerprint with a precomputed content hash does not match.")
+
+    changed_test = tests.PlaceholderTextTest(None, {"placeholder_words": ["tbd"]})
+    bumped_test = tests.PlaceholderTextTest(None, {"placeholder_words": ["lorem"]})
+    bumped_test.version = tests.PlaceholderTextTest.version + 1
+    other_test = tests.ArticleReadTimeInfo(None, {"placeholder_words": ["lorem"]})
+    for label, other_fingerprint in [
+        (u"content", site_test.get_fingerprint(changed_page)),
+        (u"settings", changed_test.get_fingerprint(page)),
+        (u"version", bumped_test.get_fingerprint(page)),
+        (u"test", other_test.get_fingerprint(page)),
+    ]:
+        if other_fingerprint == fingerprint:
+            raise Exception("Fingerprint did not change with the %s." % (label))
+
+    spelling_test = tests.SpellCheckTest(None, {})
+    spelling_fingerprint = spelling_test.get_fingerprint(page)
+    with mock.patch.object(tests, 'get_payload_policy', lambda: PAYLOAD_SUMMARY):
+        if spelling_test.get_fingerprint(page) == spelling_fingerprint:
+            raise Exception("Fingerprint did not change with the payload policy.")
+
+    # Stored results are matched on the fingerprint text, so it must stay
+    # readable in compressed payloads
+    data = tests.add_fingerprint({'text': u"Some article text. " * 100}, fingerprint)
+    dumped = dumps_payload(data, compress_min_bytes=100)
+    if fingerprint not in dumped or loads_payload(dumped) != data or u"Some article" in dumped:
+        raise Exception("Fingerprint did not survive payload compression. \nReceieved '%s' " % (dumped))
+
+    with fake_results([(1, u"a")]) as queryset:
+        if not tests.has_current_result(page, u"a", fingerprint):
+            raise Exception("Stored result with the same fingerprint should be current.")
+    if queryset.filters != [((), {'page': page, 'test': u"a", 'data__contains': fingerprint})]:
+        raise Exception("Current result lookup used unexpected filters. \nReceieved '%s' " % (queryset.filters))
+
+    # Stored results in the batch's scope are fetched once and matched on
+    # their fingerprint; (2, u"b") is in scope but was not asked for
+    fingerprints = {(1, u"a"): u"f1", (1, u"b"): u"f2", (2, u"a"): u"f3"}
+    stored_results = [
+        (1, u"a", u'{"fingerprint":"f1"}'), (1, u"b", u'{"fingerprint":"old"}'),
+        (2, u"a", u'{"fingerprint":"f3"}'), (2, u"b", u'{"fingerprint":"f3"}'), (3, u"a", None),
+    ]
+    with fake_results(stored_results) as queryset:
+        current_results = tests.get_current_results(fingerprints)
+        if tests.get_current_results({}) != set():
+            raise Exception("No fingerprints should find no current results.")
+    if current_results != set([(1, u"a"), (2, u"a")]):
+        raise Exception("Current results were not returned as keys. \nReceieved '%s' " % (current_results))
+    if queryset.filters != [((), {'page__in': set([1, 2]), 'test__in': set([u"a", u"b"])})]:
+        raise Exception("Current results were not scoped to the batch in one query. \nReceieved '%s' " % (queryset.filters))
+
+    # One query however many results are checked
+    fingerprints = dict(((page_pk, u"a"), u"f%s" % (page_pk)) for page_pk in range(5000))
+    stored_results = [(page_pk, u"a", u'{"fingerprint":"f%s"}' % (page_pk)) for page_pk in range(5000)]
+    with fake_results(stored_results) as queryset:
+        if len(tests.get_current_results(fingerprints)) != 5000 or len(queryset.filters) != 1:
+            raise Exception("Current results lookup should not grow with the number of fingerprints.")
+
+    print("Done testing result fingerprints!")
@@ -0,0 +1,48 @@
+from unittest import mock
+
+from ..utils import languages
+from ..utils.affixes import default_affix_index, no_affix_index
+from ..utils.languages import LanguageRegistry, format_resident_languages
+
+
+def test():
+
+    print("Test language resources...")
+    registry = LanguageRegistry(max_bytes=None)
+    english = registry.get('en')
+    unknown = registry.get('xx')
+
+    if 'the' not in english.stop_words or unknown.stop_words:
+        raise Exception("Stopwords were not loaded per language. \nReceieved '%s' " % (sorted(unknown.stop_words)))
+    if english.affix_index is not default_affix_index or unknown.affix_index is not no_affix_index:
+        raise Exception("Only English should use the built-in affix rules")
+    if unknown.get_affix_index({"suffixes": [{"core": ""}]}).version == no_affix_index.version:
+        raise Exception("Site affix rules were not applied to a language without built-in rules")
+
+    info = registry.info()
+    resident = [entry['language'] for entry in info['languages']]
+    if resident != ['en', 'xx'] or 'stop_words' not in info['languages'][0]['resources']:
+        raise Exception("Resident languages report is unexpected. \nReceieved '%s' " % (info))
+    if u"total" not in format_resident_languages(info):
+        raise Exception("Resident languages report could not be formatted")
+
+    # With a limit smaller than one language, only the latest language stays loaded
+    registry = LanguageRegistry(max_bytes=1)
+    registry.get('en').stop_words
+    registry.get('xx').stop_words
+    if 'en' in registry or 'xx' not in registry or registry.evictions != 1:
+        raise Exception("Least recently used language was not unloaded. \nReceieved '%s' " % (registry.info()))
+
+    # A resource that fails to load is loaded again on next use
+    registry = LanguageRegistry(max_bytes=None)
+    with mock.patch.object(languages, 'load_stopwords', side_effect=LookupError("stopwords")):
+        try:
+            registry.get('en').stop_words
+        except LookupError:
+            pass
+        else:
+            raise Exception("Stopwords that failed to load should raise.")
+    if 'the' not in registry.get('en').stop_words:
+        raise Exception("Stopwords that failed to load were cached.")
+
+    print("Done testing language resources!")
@@ -0,0 +1,70 @@
+import os
+import tempfile
+
+from ..utils.dictionary import CURATED_DIGEST_SECTION, get_curated_digest, get_dictionary_bundle
+from ..utils.lexicon import build_lexicon, open_lexicon, build_bundle, open_bundle
+
+
+def test():
+
+    print("Test compiled lexicon...")
+    words = [u'doppelgänger', u'dachshund', u'deli', u'delicatessen', u'blitz', u'à']
+    path = os.path.join(tempfile.mkdtemp(), u'test.lex')
+    lexicon = open_lexicon(build_lexicon(words, path))
+
+    if len(lexicon) != len(words):
+        raise Exception("Lexicon has unexpected size. \nExpected '%s' \nReceieved '%s' " % (len(words), len(lexicon)))
+
+    for word in words:
+        if word not in lexicon:
+            raise Exception("Lexicon is missing word '%s'" % (word))
+
+    for word in [u'', u'del', u'doppelganger', u'zebra', u'a']:
+        if word in lexicon:
+            raise Exception("Lexicon unexpectedly contains word '%s'" % (word))
+
+    expected_prefix_words = [u'deli', u'delicatessen']
+    actual_prefix_words = list(lexicon.iter_prefix(u'del'))
+    if expected_prefix_words != actual_prefix_words:
+        raise Exception("Lexicon prefix lookup got unexpected output. \nExpected '%s' \nReceieved '%s' " % (expected_prefix_words, actual_prefix_words))
+
+    if not lexicon.has_prefix(u'dopp') or lexicon.has_prefix(u'dox'):
+        raise Exception("Lexicon prefix check got unexpected output.")
+
+    # Same word count and size, different words
+    swapped_words = [u'doppelgänger', u'dachshund', u'deli', u'delicatessen', u'glitz', u'à']
+    swapped_lexicon = open_lexicon(build_lexicon(swapped_words, os.path.join(tempfile.mkdtemp(), u'test.lex')))
+    if swapped_lexicon.size != lexicon.size or swapped_lexicon.version == lexicon.version:
+        raise Exception("Lexicons with different words should have different versions.")
+    if open_lexicon(path).version != lexicon.version:
+        raise Exception("Lexicon version should only depend on its words.")
+
+    sections = {u'words': words, u'stopwords/english': [u'the', u'and'], u'stopwords/spanish': [u'el', u'y', u'más']}
+    bundle = open_bundle(build_bundle(sections, os.path.join(tempfile.mkdtemp(), u'test.bundle')))
+    if list(bundle) != sorted(sections):
+        raise Exception("Bundle has unexpected sections. \nExpected '%s' \nReceieved '%s' " % (sorted(sections), list(bundle)))
+    for name, section_words in sections.items():
+        if sorted(bundle.get(name)) != sorted(section_words):
+            raise Exception("Bundle section '%s' has unexpected words. \nReceieved '%s' " % (name, list(bundle.get(name))))
+    if u'el' in bundle.get(u'stopwords/english') or bundle.get(u'stopwords/french') is not None:
+        raise Exception("Bundle sections are not kept apart.")
+    if bundle.get(u'words').version == lexicon.version:
+        raise Exception("Bundle sections should be versioned by the bundle contents.")
+
+    # Bundles built from other curated word lists are ignored
+    bundle_path = os.environ.get('SITECOMBER_DICTIONARY_BUNDLE')
+    try:
+        for digest, expected_current in [(get_curated_digest(), True), (u'0' * 40, False)]:
+            path = build_bundle(dict(sections, **{CURATED_DIGEST_SECTION: [digest]}), os.path.join(tempfile.mkdtemp(), u'test.bundle'))
+            os.environ['SITECOMBER_DICTIONARY_BUNDLE'] = path
+            get_dictionary_bundle.cache_clear()
+            if (get_dictionary_bundle() is not None) != expected_current:
+                raise Exception("Dictionary bundle with curated digest %s should %sbe used." % (digest, u"" if expected_current else u"not "))
+    finally:
+        if bundle_path is None:
+            os.environ.pop('SITECOMBER_DICTIONARY_BUNDLE', None)
+        else:
+            os.environ['SITECOMBER_DICTIONARY_BUNDLE'] = bundle_path
+        get_dictionary_bundle.cache_clear()
+
+    print("Done testing compiled lexicon!")
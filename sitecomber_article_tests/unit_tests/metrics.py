@@ -0,0 +1,42 @@
+from ..utils.metrics import configure_metrics, collect_page_timings, get_metrics_snapshot, \
+    increment, reset_metrics, timer
+
+
+class RecordingSink(object):
+
+    def __init__(self):
+        self.events = []
+
+    def timing(self, name, seconds):
+        self.events.append(('timing', name))
+
+    def increment(self, name, value=1):
+        self.events.append(('increment', name, value))
+
+
+def test():
+
+    print("Test metrics...")
+    sink = RecordingSink()
+    configure_metrics(sink)
+    reset_metrics()
+
+    with collect_page_timings() as timings:
+        with timer('test.stage'):
+            increment('test.words', 3)
+        with timer('test.stage'):
+            pass
+
+    snapshot = get_metrics_snapshot()
+    if snapshot['timers']['test.stage']['count'] != 2 or snapshot['counters']['test.words'] != 3:
+        raise Exception("Unexpected metrics snapshot. \nReceieved '%s' " % (snapshot))
+    if list(timings) != ['test.stage']:
+        raise Exception("Page timings were not collected. \nReceieved '%s' " % (timings))
+
+    expected_events = [('increment', 'test.words', 3), ('timing', 'test.stage'), ('timing', 'test.stage')]
+    if sink.events != expected_events:
+        raise Exception("Metrics sink got unexpected events. \nExpected '%s' \nReceieved '%s' " % (expected_events, sink.events))
+
+    configure_metrics(None)
+    reset_metrics()
+    print("Done testing metrics!")
@@ -0,0 +1,35 @@
+from collections import namedtuple
+
+from ..utils.article import is_reader_view_enabled
+from ..utils.payload import PAYLOAD_FULL, PAYLOAD_EXCERPT, PAYLOAD_SUMMARY, dumps_payload, loads_payload
+
+
+Page = namedtuple('Page', ['url', 'last_text_content'])
+
+
+def test():
+
+    print("Test result payloads...")
+    html = u"<html><head><title>Payload Test</title></head><body><article><h1>Payload Test</h1><img src=\"/a.jpg\"><p>%s</p></article></body></html>" % (u"This is a sentence about payloads. " * 40)
+    page = Page(url=u"http://www.example.com/payload/", last_text_content=html)
+
+    full = is_reader_view_enabled(page, {}, PAYLOAD_FULL)[3]['article']
+    excerpt = is_reader_view_enabled(page, {}, PAYLOAD_EXCERPT, 50)[3]['article']
+    summary = is_reader_view_enabled(page, {}, PAYLOAD_SUMMARY)[3]['article']
+
+    if excerpt['text_excerpt'] != full['text'][:50] or excerpt['text_length'] != len(full['text']):
+        raise Exception("Excerpt payload does not match the full article text. \nReceieved '%s' " % (excerpt))
+    if 'text' in summary or 'imgs' in summary or summary['imgs_count'] != len(full['imgs']):
+        raise Exception("Summary payload should only keep lengths, counts and hashes. \nReceieved '%s' " % (summary))
+    if summary['text_hash'] != excerpt['text_hash'] or summary['title'] != full['title']:
+        raise Exception("Summary payload lost the text hash or title. \nReceieved '%s' " % (summary))
+
+    data = {'article': full, 'fingerprint': u"abc123"}
+    compact = dumps_payload(data)
+    compressed = dumps_payload(data, compress_min_bytes=100)
+    if u"\n" in compact or loads_payload(compact) != data:
+        raise Exception("Compact payload did not round trip. \nReceieved '%s' " % (compact))
+    if len(compressed) >= len(compact) or u"abc123" not in compressed or loads_payload(compressed) != data:
+        raise Exception("Compressed payload did not round trip or lost its fingerprint. \nReceieved '%s' " % (compressed))
+
+    print("Done testing result payloads!")
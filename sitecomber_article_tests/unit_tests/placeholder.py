@@ -1,4 +1,6 @@
-from ..utils.article import get_placeholder_words
+import readtime
+
+from ..utils.article import TextAnalysis, get_placeholder_matcher, get_placeholder_words
 
 
 def test():
@@ -12,4 +14,18 @@ def test():
     if expected_placeholder_words != actual_placeholder_words:
         raise Exception("Placeholder word finder got unexpected output. \nExpected '%s' \nReceieved '%s' " % (expected_placeholder_words, actual_placeholder_words))
 
+    analysis = TextAnalysis(u"TK: a title", input_text)
+    for words in [placeholder_words, ['tk', 'lorem ipsum'], []]:
+        matcher = get_placeholder_matcher(words)
+        expected_placeholder_words = matcher.find(analysis.full_text)
+        actual_placeholder_words = analysis.find_placeholder_words(matcher)
+        if expected_placeholder_words != actual_placeholder_words:
+            raise Exception("Text analysis placeholder lookup got unexpected output. \nExpected '%s' \nReceieved '%s' " % (expected_placeholder_words, actual_placeholder_words))
+
+    for text in [input_text, u"...%s!" % (u"word " * 300), u"?"]:
+        expected_seconds = readtime.of_text(text).seconds
+        actual_seconds = TextAnalysis(u"", text).get_read_time().seconds
+        if expected_seconds != actual_seconds:
+            raise Exception("Text analysis read time got unexpected output. \nExpected '%s' \nReceieved '%s' " % (expected_seconds, actual_seconds))
+
     print("Done testing placeholder functions!")
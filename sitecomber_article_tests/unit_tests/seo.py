@@ -0,0 +1,64 @@
+from collections import namedtuple
+
+from ..utils.seo import has_meta_tags, has_socialmedia_tags, build_meta_index, build_head_meta_index, meta_index_cache
+
+
+Page = namedtuple('Page', ['url', 'last_text_content'])
+
+
+def test():
+
+    print("Test meta index...")
+    html = u"""<html><head>
+        <meta http-equiv="content-type" content="text/html; charset=utf-8">
+        <meta name="Viewport" content="width=device-width">
+        <title>Meta Test</title>
+        <meta name="description" content="First description">
+        <meta name="description" content="Second description">
+        <meta property="og:title" content="Meta Test">
+        <meta name="twitter:card">
+    </head><body><svg><title>Icon</title></svg></body></html>"""
+
+    meta_index = build_meta_index(html)
+    expected = [
+        (meta_index.title, u"Meta Test"),
+        (meta_index.get('http-equiv', 'Content-Type'), u"text/html; charset=utf-8"),
+        (meta_index.get('name', 'viewport'), u"width=device-width"),
+        (meta_index.get('name', 'description'), u"First description"),
+        (meta_index.get('property', 'og:title'), u"Meta Test"),
+        (meta_index.get('name', 'twitter:card'), None),
+        (meta_index.get('name', 'keywords'), None),
+    ]
+    for received, expected_value in expected:
+        if received != expected_value:
+            raise Exception("Meta index lookup failed. \nExpected '%s' \nReceieved '%s' " % (expected_value, received))
+
+    body = u"<p>%s</p>" % (u"Lots of body text. " * 2000)
+    head_only = html.replace(u"<svg><title>Icon</title></svg>", body)
+    if build_head_meta_index(head_only, chunk_size=512) is None:
+        raise Exception("Head-only meta extraction should not need a full parse when the body has no meta tags.")
+
+    late_meta = head_only.replace(u"</body>", u"<meta name=\"keywords\" content=\"late\"></body>")
+    if build_head_meta_index(late_meta, chunk_size=512) is not None:
+        raise Exception("Head-only meta extraction should fall back to a full parse for meta tags in the body.")
+    if build_meta_index(late_meta).get('name', 'keywords') != u"late":
+        raise Exception("Meta index missed a meta tag in the body.")
+
+    if build_meta_index(u"").title is not None:
+        raise Exception("Meta index of an empty document should have no title.")
+
+    meta_index_cache.clear()
+    page = Page(url=u"http://www.example.com/meta/", last_text_content=html)
+    meta_tags_correct, status, message, data = has_meta_tags(page, {})
+    if not meta_tags_correct or data['description'] != u"First description":
+        raise Exception("Meta tags check failed. \nReceieved '%s' '%s' " % (status, message))
+
+    social_tags_correct, status, message, data = has_socialmedia_tags(page, {})
+    if social_tags_correct or data['property__ogtitle'] != u"Meta Test":
+        raise Exception("Social meta tags check failed. \nReceieved '%s' '%s' " % (status, message))
+
+    info = meta_index_cache.info()
+    if info['hits'] != 1 or info['misses'] != 1:
+        raise Exception("Meta index was not shared between checks. \nExpected 1 hit and 1 miss \nReceieved '%s' " % (info))
+
+    print("Done testing meta index!")
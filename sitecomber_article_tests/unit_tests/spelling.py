@@ -1,6 +1,14 @@
+import os
+import tempfile
+from unittest import mock
+
 from ..utils.spelling import remove_emails, remove_hashes, remove_phonenumbers, \
-    remove_urls, get_misspelled_words, simplify_word
+    remove_urls, scrub_text, get_check_words, get_misspelled_words, get_word_verdicts, simplify_word
 from ..utils.dictionary import get_extended_dictionary
+from ..utils.verdicts import get_word_verdict_cache
+from ..utils.checkers import LexiconChecker, get_checker_version
+from ..utils.languages import get_language_resources
+from ..utils.lexicon import build_lexicon, open_lexicon
 
 
 def test():
@@ -67,8 +75,34 @@ URL with query:
     else:
         print("URL removing logic successful")
 
-    # emove_emails, remove_hashes, remove_phonenumbers, \
-    # remove_urls, remove_acronyms,
+    # The scrubber should leave the same words behind as the individual
+    # removal functions applied one after another, including words glued to
+    # links and phone numbers
+    glued_inputs = [
+        u"caf\u00e9/mailto:a@b.c/", u"self-made-mailto:a@b.c", u"see http://example.com/a@b.c#top now",
+        u"file.pdf.mailto:a@b.c,user@", u"call tel:+1 - 555-1234 or (555) 123-4567/news://x@x.com",
+        u"#tag.www.example.org-word,555-1234 10.0.0.1,",
+    ]
+    for scrub_input in [email_input, hash_input, phone_input, url_input] + glued_inputs:
+        expected_words = remove_phonenumbers(remove_hashes(remove_emails(remove_urls(scrub_input)))).split()
+        actual_words = scrub_text(scrub_input).split()
+        if expected_words != actual_words:
+            raise Exception("Text scrubbing function returned unexpected output. \nInput '%s' \nExpected '%s' \nReceieved '%s' " % (scrub_input, expected_words, actual_words))
+    print("Text scrubbing logic successful")
+
+    # Acronyms are removed after contractions are expanded, so all-caps
+    # contractions don't leave fragments behind
+    contraction_inputs = [
+        (u"THE CEO ISN'T HERE.", []),
+        (u"I'M HAPPY", [u"I"]),
+        (u"Y'ALL WON'T", []),
+        (u"The CEO's team DIDN'T ship", [u"The", u"team", u"ship"]),
+    ]
+    for contraction_input, expected_words in contraction_inputs:
+        actual_words = get_check_words(contraction_input, frozenset())
+        if expected_words != actual_words:
+            raise Exception("All-caps contractions were not removed with acronyms. \nInput '%s' \nExpected '%s' \nReceieved '%s' " % (contraction_input, expected_words, actual_words))
+    print("Acronym removal logic successful")
 
     words_to_simplify = ['mustardy', 'misstated', 'rashy', 'rashiness',
                          'toddlerhood', 'clinginess', 'seatmates',
@@ -163,4 +197,27 @@ TODO -- complete loan word list spanish, french, yiddish, etc à française
     if len(misspelled_words) != expected_error_count:
         raise Exception("Words incorrectly flagged. Should have found %s misspellings from %s but receieved: %s" % (expected_error_count, test_text_with_errors, misspelled_words))
 
+    print("Getting misspelled words - cached verdicts...")
+    cached_misspelled_words = get_misspelled_words(test_text_with_errors, "en", extended_dictionary, False)
+    get_word_verdict_cache().clear()
+    uncached_misspelled_words = get_misspelled_words(test_text_with_errors, "en", extended_dictionary, False)
+    if cached_misspelled_words != misspelled_words or uncached_misspelled_words != misspelled_words:
+        raise Exception("Cached word verdicts changed the result. \nExpected '%s' \nReceieved '%s' and '%s' " % (misspelled_words, cached_misspelled_words, uncached_misspelled_words))
+
+    verdicts = get_word_verdicts(["asdflkjd", "walking"], "en", extended_dictionary)
+    expected_verdicts = {"asdflkjd": "misspelled:asdflkjd", "walking": "known"}
+    if verdicts != expected_verdicts:
+        raise Exception("Unexpected word verdicts. \nExpected '%s' \nReceieved '%s' " % (expected_verdicts, verdicts))
+
+    # Verdicts are not reused across spell checkers
+    lexicon = open_lexicon(build_lexicon([u"asdflkjd"], os.path.join(tempfile.mkdtemp(), u"spellchecker-en.lex")))
+    lexicon_checker = LexiconChecker(lexicon)
+    if get_checker_version(lexicon_checker) == get_checker_version(get_language_resources("en").spell_checker):
+        raise Exception("Spell checkers should have different versions.")
+    resources = mock.Mock(spell_checker=lexicon_checker)
+    with mock.patch('sitecomber_article_tests.utils.spelling.get_language_resources', lambda language: resources):
+        verdicts = get_word_verdicts(["asdflkjd"], "en", extended_dictionary)
+    if verdicts != {"asdflkjd": "proper_noun"}:
+        raise Exception("Word verdicts were reused from another spell checker. \nReceieved '%s' " % (verdicts))
+
     print("Done testing spelling!")
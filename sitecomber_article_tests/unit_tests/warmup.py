@@ -0,0 +1,26 @@
+from ..utils.executor import analyze_page, create_page_executor
+from ..utils.warmup import warm_up, format_report
+
+
+def test():
+
+    print("Test warm-up...")
+    # pyspellchecker has no dictionary for this language
+    report = warm_up(['zz'])
+    errors = dict((component, error) for component, seconds, error in report if error is not None)
+    if list(errors) != [u"spell checker (zz)"]:
+        raise Exception("Warm-up should report failed components and load the rest. \nReceieved '%s' " % (format_report(report)))
+    if u"failed: " not in format_report(report):
+        raise Exception("Warm-up report is missing the failed component. \nReceieved '%s' " % (format_report(report)))
+
+    # A failed warm-up must not break the worker pool
+    html = u"<html><head><title>Lorem</title></head><body><article><p>Lorem ipsum.</p></article></body></html>"
+    executor = create_page_executor(max_workers=1, languages=['zz'])
+    try:
+        results = executor.submit(analyze_page, u"http://www.example.com/", html, [('placeholder_text', {}, ([u"lorem"],))]).result()
+    finally:
+        executor.shutdown()
+    if not results[0][0]:
+        raise Exception("Worker pool did not analyze the page after a failed warm-up. \nReceieved '%s' " % (results))
+
+    print("Done testing warm-up!")
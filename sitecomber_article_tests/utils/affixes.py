@@ -0,0 +1,271 @@
+import json
+
+from .cache import LRUCache
+
+
+default_suffixes = [
+    {'able': ''},
+    {'acy': ''},
+    {'ant': ''},
+    {'al': ''},
+    {'ance': ''},
+    {'ate': ''},
+    {'bed': ''},
+    {'bility': ''},
+    {'bility': 'ble'},
+    {'bio': ''},
+    {'dom': ''},
+    {'cced': 'c'},
+    {'cces': 'c'},
+    {'ccing': 'c'},
+    {'dded': 'd'},
+    {'ddes': 'd'},
+    {'dding': 'd'},
+    {'ed': ''},
+    {'ed': 'e'},
+    {'ee': ''},
+    {'en': ''},
+    {'en': 'e'},
+    {'ence': ''},
+    {'ence': 'e'},
+    {'ent': ''},
+    {'er': ''},
+    {'er': 'e'},
+    {'erizer': ''},
+    {'es': ''},
+    {'es': 'e'},
+    {'esque': ''},
+    {'est': ''},
+    {'ffed': 'f'},
+    {'ffes': 'f'},
+    {'ffing': 'f'},
+    {'ful': ''},
+    {'fy': ''},
+    {'gged': 'g'},
+    {'gges': 'g'},
+    {'gging': 'g'},
+    {'hood': ''},
+    {'ible': ''},
+    {'ic': ''},
+    {'ical': ''},
+    {'ied': ''},
+    {'ied': 'y'},
+    {'ier': ''},
+    {'ier': 'y'},
+    {'ies': ''},
+    {'ies': 'y'},
+    {'iest': ''},
+    {'iest': 'y'},
+    {'ify': ''},
+    {'ily': ''},
+    {'iness': ''},
+    {'iness': 'y'},
+    {'ing': ''},
+    {'ing': 'e'},
+    {'ious': ''},
+    {'ise': ''},
+    {'ish': ''},
+    {'ism': ''},
+    {'ist': ''},
+    {'ity': ''},
+    {'ity': 'y'},
+    {'ive': ''},
+    {'ize': ''},
+    {'izer': ''},
+    {'jjed': 'j'},
+    {'jjes': 'j'},
+    {'jjing': 'j'},
+    {'kked': 'k'},
+    {'kkes': 'k'},
+    {'kking': 'k'},
+    {'less': ''},
+    {'like': ''},
+    {'lled': 'l'},
+    {'lles': 'l'},
+    {'lling': 'l'},
+    {'long': ''},
+    {'ly': ''},
+    {'mate': ''},
+    {'ment': ''},
+    {'mmed': 'm'},
+    {'mmes': 'm'},
+    {'mming': 'm'},
+    {'ness': ''},
+    {'nned': 'n'},
+    {'nnes': 'n'},
+    {'nning': 'n'},
+    {'ologist': ''},
+    {'ologist': 'ology'},
+    {'ous': ''},
+    {'ped': ''},
+    {'pped': 'p'},
+    {'ppes': 'p'},
+    {'pping': 'p'},
+    {'qqed': 'q'},
+    {'qqes': 'q'},
+    {'qqing': 'q'},
+    {'red': ''},
+    {'red': 're'},
+    {'rred': 'r'},
+    {'rres': 'r'},
+    {'rring': 'r'},
+    {'s': ''},
+    {'sion': ''},
+    {'ssed': 's'},
+    {'sses': 's'},
+    {'ssing': 's'},
+    {'tion': ''},
+    {'tion': 'te'},
+    {'tize': ''},
+    {'tize': 'ty'},
+    {'tize': 't'},
+    {'tted': 't'},
+    {'ttes': 't'},
+    {'tting': 't'},
+    {'ty': ''},
+    {'vved': 'v'},
+    {'vves': 'v'},
+    {'vving': 'v'},
+    {'ward': ''},
+    {'wards': ''},
+    {'wide': ''},
+    {'wise': ''},
+    {'worthy': ''},
+    {'y': ''},
+    {'zzed': 'z'},
+    {'zzes': 'z'},
+    {'zzing': 'z'},
+]
+
+default_prefixes = [
+    {'ante': ''},
+    {'anti': ''},
+    {'auto': ''},
+    {'bi': ''},
+    {'bio': ''},
+    {'bis': ''},
+    {'co': ''},
+    {'de': ''},
+    {'dis': ''},
+    {'en': ''},
+    {'ex': ''},
+    {'extra': ''},
+    {'hyper': ''},
+    {'ig': ''},
+    {'im': ''},
+    {'in': ''},
+    {'inter': ''},
+    {'ir': ''},
+    {'macro': ''},
+    {'mal': ''},
+    {'mega': ''},
+    {'micro': ''},
+    {'mini': ''},
+    {'mis': ''},
+    {'mono': ''},
+    {'multi': ''},
+    {'neo': ''},
+    {'neuro': ''},
+    {'non': ''},
+    {'omni': ''},
+    {'over': ''},
+    {'penta': ''},
+    {'per': ''},
+    {'poly': ''},
+    {'post': ''},
+    {'pre': ''},
+    {'pro': ''},
+    {'quad': ''},
+    {'re': ''},
+    {'retro': ''},
+    {'semi': ''},
+    {'socio': ''},
+    {'sub': ''},
+    {'super': ''},
+    {'tran': ''},
+    {'tri': ''},
+    {'un': ''},
+    {'under': ''},
+    {'uni': ''}
+]
+
+
+class AffixIndex(object):
+    """
+    Prefix and suffix rules compiled into a forward prefix trie and a
+    reversed suffix trie, so finding the rules that apply to a word costs
+    O(len(word)) rather than O(rules).
+
+    Options are returned longest affix first; rules sharing the same affix
+    are returned in reverse order of definition.
+    """
+
+    def __init__(self, prefixes, suffixes):
+        self.prefix_trie = self._compile(prefixes, 'prefix', reverse=False)
+        self.suffix_trie = self._compile(suffixes, 'suffix', reverse=True)
+        self.version = json.dumps([prefixes, suffixes], sort_keys=True)
+
+    @staticmethod
+    def _compile(rules, rule_type, reverse):
+        # Each trie node is [children, options]
+        root = [{}, []]
+        for rule in rules:
+            for search, replace in rule.items():
+                node = root
+                for char in (reversed(search) if reverse else search):
+                    node = node[0].setdefault(char, [{}, []])
+                node[1].insert(0, {
+                    'type': rule_type,
+                    'search': search,
+                    'replace': replace
+                })
+        return root
+
+    @staticmethod
+    def _match(trie, chars):
+        matches = []
+        node = trie
+        for char in chars:
+            node = node[0].get(char)
+            if node is None:
+                break
+            if node[1]:
+                matches.append(node[1])
+        output = []
+        for options in reversed(matches):
+            output.extend(options)
+        return output
+
+    def get_options(self, word):
+        return self._match(self.prefix_trie, word) + self._match(self.suffix_trie, reversed(word))
+
+
+default_affix_index = AffixIndex(default_prefixes, default_suffixes)
+# The built-in rules are English; other languages only use a site's own rules
+no_affix_index = AffixIndex([], [])
+
+AFFIX_INDEX_CACHE_SIZE = 32
+affix_index_cache = LRUCache(AFFIX_INDEX_CACHE_SIZE)
+
+
+def get_default_affix_rules(language='en'):
+    if language == 'en':
+        return default_prefixes, default_suffixes
+    return [], []
+
+
+def get_affix_index(affix_rules=None, language='en'):
+    """
+    Returns the language's default affix index, extended with a site's custom rules:
+
+        {"prefixes": [{"cyber": ""}], "suffixes": [{"core": ""}]}
+    """
+    if not affix_rules:
+        return default_affix_index if language == 'en' else no_affix_index
+
+    prefixes, suffixes = get_default_affix_rules(language)
+    key = (language, json.dumps(affix_rules, sort_keys=True))
+    return affix_index_cache.get_or_set(key, lambda: AffixIndex(
+        prefixes + list(affix_rules.get('prefixes', [])),
+        suffixes + list(affix_rules.get('suffixes', []))
+    ))
@@ -0,0 +1,99 @@
+"""
+Asyncio counterparts of the article and SEO checks.
+
+The checks are CPU bound, so each call runs in an executor (the event
+loop's default thread pool unless configured otherwise) while the loop
+keeps fetching. A semaphore bounds how many analyses run at once. Timeouts
+and cancellation stop waiting for a result; work already running in the
+executor finishes in the background, keeping its slot until it does, and is
+discarded.
+"""
+import asyncio
+import functools
+import weakref
+
+from .executor import analyze_page
+
+
+DEFAULT_MAX_CONCURRENCY = 4
+
+_config = {
+    'executor': None,
+    'max_concurrency': DEFAULT_MAX_CONCURRENCY,
+    'timeout': None,
+}
+_semaphores = weakref.WeakKeyDictionary()
+
+
+def configure(executor=None, max_concurrency=DEFAULT_MAX_CONCURRENCY, timeout=None):
+    """
+    executor may be a thread or process pool; None uses the loop's default.
+    timeout is the default number of seconds to wait for each analysis.
+    """
+    _config['executor'] = executor
+    _config['max_concurrency'] = max_concurrency
+    _config['timeout'] = timeout
+    _semaphores.clear()
+
+
+def get_semaphore():
+    # Semaphores belong to the loop they are first used on
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _semaphores[loop] = asyncio.Semaphore(_config['max_concurrency'])
+    return semaphore
+
+
+def _release(semaphore, future):
+    # Retrieve the outcome nobody may be waiting for, so a failure in a
+    # discarded analysis is not reported as never retrieved
+    if not future.cancelled():
+        future.exception()
+    semaphore.release()
+
+
+async def run_analyzer_async(name, page, settings, *args, timeout=None, collect_timings=False):
+    loop = asyncio.get_running_loop()
+    timeout = _config['timeout'] if timeout is None else timeout
+
+    # Only the url and html are sent, so process pools work as well as threads
+    call = functools.partial(analyze_page, page.url, page.last_text_content, [(name, settings, args)], collect_timings)
+
+    # The slot is released when the analysis finishes rather than when the
+    # caller stops waiting, since the executor can't interrupt running work
+    semaphore = get_semaphore()
+    await semaphore.acquire()
+    try:
+        future = loop.run_in_executor(_config['executor'], call)
+    except BaseException:
+        semaphore.release()
+        raise
+    future.add_done_callback(functools.partial(_release, semaphore))
+
+    results = await asyncio.wait_for(asyncio.shield(future), timeout)
+    return results[0]
+
+
+async def is_reader_view_enabled_async(page, settings, timeout=None):
+    return await run_analyzer_async('reader_view', page, settings, timeout=timeout)
+
+
+async def contains_placeholder_text_async(page, settings, placeholder_words, timeout=None):
+    return await run_analyzer_async('placeholder_text', page, settings, placeholder_words, timeout=timeout)
+
+
+async def get_article_readtime_async(page, settings, timeout=None):
+    return await run_analyzer_async('read_time', page, settings, timeout=timeout)
+
+
+async def check_spelling_async(page, settings, timeout=None):
+    return await run_analyzer_async('spelling', page, settings, timeout=timeout)
+
+
+async def has_meta_tags_async(page, settings, timeout=None):
+    return await run_analyzer_async('meta_tags', page, settings, timeout=timeout)
+
+
+async def has_socialmedia_tags_async(page, settings, timeout=None):
+    return await run_analyzer_async('social_meta_tags', page, settings, timeout=timeout)
@@ -1,31 +1,70 @@
 import re
+import math
 import logging
 
 from newspaper import Article
-from newspaper.utils import get_available_languages
 
-import readtime
+import ahocorasick
+from readtime.result import Result as ReadTimeResult
+from readtime.utils import DEFAULT_WPM
+
+from .cache import LRUCache, get_content_hash
+from .article_store import get_article_store
+from .config import get_site_config
+from .metrics import increment, timer
+from .payload import PAYLOAD_FULL, DEFAULT_EXCERPT_LENGTH, add_text, add_list
 
 
 logger = logging.getLogger('django')
 
+# Parsed articles are shared by every test that runs against the same page
+ARTICLE_CACHE_SIZE = 32
+article_cache = LRUCache(ARTICLE_CACHE_SIZE)
+
 
 def get_article(page, settings):
     url = page.url
     html = page.last_text_content
 
-    language = 'en' if 'lang' not in settings else settings['lang']
-    if language not in get_available_languages():
-        logger.error(u"Language %s not found. Defaulting to 'en' instead." % (language))
-        language = 'en'
+    language = get_site_config(settings).language
+    cache_key = (url, get_content_hash(html), language)
+    article = article_cache.get(cache_key)
+    if article is not None:
+        increment('article.cache_hit')
+        return article
+    increment('article.cache_miss')
+
+    # Image URLs are resolved against the page URL, so it is part of the stored digest
+    store = get_article_store()
+    store_digest = get_content_hash(u"%s\n%s" % (url, html)) if store else None
+    if store:
+        with timer('article.store_get'):
+            article = store.get(store_digest, language)
+        increment('article.store_hit' if article is not None else 'article.store_miss')
 
-    article = Article(url=url, language=language)
-    article.download(html)
-    article.parse()
+    if article is None:
+        with timer('article.parse'):
+            article = Article(url=url, language=language)
+            article.download(html)
+            article.parse()
+        if store:
+            with timer('article.store_set'):
+                store.set(store_digest, language, article)
+
+    article_cache.set(cache_key, article)
     return article
 
 
-def is_reader_view_enabled(page, settings):
+def get_article_cache_info():
+    return article_cache.info()
+
+
+def clear_article_cache():
+    article_cache.clear()
+    text_analysis_cache.clear()
+
+
+def is_reader_view_enabled(page, settings, payload=PAYLOAD_FULL, excerpt_length=DEFAULT_EXCERPT_LENGTH):
 
     article = get_article(page, settings)
 
@@ -49,16 +88,15 @@ def is_reader_view_enabled(page, settings):
             messages.append(u"WARNING: Aricle missing publish date.")
             status = "warning"
 
-        data = {
-            'article': {
-                'text': article.text,
-                'title': article.title,
-                'authors': article.authors,
-                'publish_date': None if not article.publish_date else article.publish_date.isoformat(),
-                'top_image': article.top_image,
-                'imgs': list(article.imgs)
-            }
+        article_data = {
+            'title': article.title,
+            'authors': article.authors,
+            'publish_date': None if not article.publish_date else article.publish_date.isoformat(),
+            'top_image': article.top_image,
         }
+        add_text(article_data, 'text', article.text, payload, excerpt_length)
+        add_list(article_data, 'imgs', article.imgs, payload)
+        data = {'article': article_data}
     else:
         messages.append(u"Page missing a structured article.")
         status = "error"
@@ -67,22 +105,94 @@ def is_reader_view_enabled(page, settings):
     return reader_view_enabled, status, message, data
 
 
-def get_placeholder_words(input_text, placeholder_words):
+def is_word_boundary(text, position):
+    # Same test as the regex \b assertion
+    before = position > 0 and (text[position - 1].isalnum() or text[position - 1] == '_')
+    after = position < len(text) and (text[position].isalnum() or text[position] == '_')
+    return before != after
+
+
+class PlaceholderMatcher(object):
+    """
+    Finds whole-word, case-insensitive occurrences of any placeholder word
+    in a single pass over the text using an Aho-Corasick automaton.
+    """
 
-    placeholder_words_found = []
-    for placeholder_string in placeholder_words:
-        matches = re.finditer(r'\b%s\b' % (placeholder_string), input_text, re.IGNORECASE)
-        for match in matches:
-            placeholder_words_found.append(match.group(0))
+    def __init__(self, placeholder_words):
+        self.placeholder_words = [word for word in placeholder_words if word]
+        self.automaton = ahocorasick.Automaton()
+        for index, word in enumerate(self.placeholder_words):
+            key = word.lower()
+            length, indexes = self.automaton.get(key, (len(key), []))
+            indexes.append(index)
+            self.automaton.add_word(key, (length, indexes))
+        if len(self.automaton):
+            self.automaton.make_automaton()
 
-    return placeholder_words_found
+    def find_regex(self, input_text):
+        matches = []
+        for index, placeholder_string in enumerate(self.placeholder_words):
+            for match in re.finditer(r'\b%s\b' % (re.escape(placeholder_string)), input_text, re.IGNORECASE):
+                matches.append((index, match.start(), match.end()))
+        return matches
+
+    def find_automaton(self, input_text, lowered_text):
+        matches = []
+        for end, (length, indexes) in self.automaton.iter(lowered_text):
+            start = end - length + 1
+            if is_word_boundary(input_text, start) and is_word_boundary(input_text, end + 1):
+                for index in indexes:
+                    matches.append((index, start, end + 1))
+        return matches
+
+    def find(self, input_text):
+        if not len(self.automaton):
+            return []
+
+        lowered_text = input_text.lower()
+        if len(lowered_text) != len(input_text):
+            # Lowercasing changed character offsets; fall back to regular expressions
+            matches = self.find_regex(input_text)
+        else:
+            matches = self.find_automaton(input_text, lowered_text)
+
+        # Report matches grouped by placeholder word, in text order, without
+        # overlapping matches of the same word.
+        placeholder_words_found = []
+        last_index, last_end = None, 0
+        for index, start, end in sorted(matches):
+            if index != last_index:
+                last_index, last_end = index, 0
+            if start >= last_end:
+                placeholder_words_found.append(input_text[start:end])
+                last_end = end
+        return placeholder_words_found
+
+
+PLACEHOLDER_MATCHER_CACHE_SIZE = 64
+placeholder_matcher_cache = LRUCache(PLACEHOLDER_MATCHER_CACHE_SIZE)
+
+
+def get_placeholder_matcher(placeholder_words):
+    key = tuple(placeholder_words)
+    return placeholder_matcher_cache.get_or_set(key, lambda: PlaceholderMatcher(key))
+
+
+def get_placeholder_words(input_text, placeholder_words):
+    return get_placeholder_matcher(placeholder_words).find(input_text)
 
 
 def contains_placeholder_text(page, settings, placeholder_words):
-    article = get_article(page, settings)
+    config = get_site_config(settings)
+    if placeholder_words == config.placeholder_words:
+        matcher = config.placeholder_matcher
+    else:
+        matcher = get_placeholder_matcher(placeholder_words)
 
     data = {'placeholder_words_searched': placeholder_words, 'placeholder_words_found': []}
-    placeholder_words_found = get_placeholder_words(u"%s %s" % (article.title, article.text), placeholder_words)
+    analysis = get_text_analysis(page, settings)
+    with timer('placeholder.find'):
+        placeholder_words_found = analysis.find_placeholder_words(matcher)
 
     data['placeholder_words_found'] = placeholder_words_found
     if len(placeholder_words_found) > 0:
@@ -92,11 +202,100 @@ def contains_placeholder_text(page, settings, placeholder_words):
         return False, message, data
 
 
+word_re = re.compile(r"\w+")
+# Maps ASCII word characters to themselves and every other byte to a space
+ascii_word_table = bytes(byte if chr(byte).isalnum() or chr(byte) == '_' else 32 for byte in range(128)) + b' ' * 128
+
+
+def count_words(text):
+    """
+    Number of runs of word characters (\w+) in text
+    """
+    if text.isascii():
+        # Same count as the regular expression, without building a match per word
+        return len(text.encode('ascii').translate(ascii_word_table).split())
+    return len(word_re.findall(text))
+
+
+class TextAnalysis(object):
+    """
+    Analysis of an article's title and text, shared by the read time,
+    placeholder and spelling checks of a page so that each part is only
+    computed once.
+    """
+
+    def __init__(self, title, text):
+        self.title = title or u""
+        self.text = text or u""
+        self._full_text = None
+        self._word_count = None
+        self._placeholder_words = {}
+        self._check_words = {}
+
+    @property
+    def full_text(self):
+        if self._full_text is None:
+            self._full_text = u"%s %s" % (self.title, self.text)
+        return self._full_text
+
+    @property
+    def word_count(self):
+        if self._word_count is None:
+            with timer('text.tokenize'):
+                self._word_count = count_words(self.text)
+        return self._word_count
+
+    def get_read_time(self, wpm=DEFAULT_WPM):
+        """
+        Same result as readtime.of_text(text)
+        """
+        # readtime splits the stripped text on \W+, so leading or trailing
+        # punctuation adds an empty word
+        text = self.text.strip()
+        words = 1
+        if text:
+            words = self.word_count + (word_re.match(text[0]) is None) + (word_re.match(text[-1]) is None)
+        return ReadTimeResult(seconds=math.ceil(words / wpm * 60), wpm=wpm)
+
+    def find_placeholder_words(self, matcher):
+        """
+        Placeholder words in the title and text, see PlaceholderMatcher.find
+        """
+        key = tuple(matcher.placeholder_words)
+        if key not in self._placeholder_words:
+            self._placeholder_words[key] = matcher.find(self.full_text)
+        return list(self._placeholder_words[key])
+
+    def get_check_words(self, stop_words):
+        """
+        Spelling candidates, see spelling.get_check_words
+        """
+        if stop_words not in self._check_words:
+            from .spelling import get_check_words
+            self._check_words[stop_words] = get_check_words(u'%s. %s' % (self.title, self.text), stop_words)
+        return self._check_words[stop_words]
+
+
+# Every test for a page runs before the next page, so only the most recent
+# pages are kept
+TEXT_ANALYSIS_CACHE_SIZE = 4
+text_analysis_cache = LRUCache(TEXT_ANALYSIS_CACHE_SIZE)
+
+
+def get_text_analysis(page, settings):
+    article = get_article(page, settings)
+    # Cached articles hand back the same strings, whose hashes Python caches
+    key = (article.title, article.text)
+    return text_analysis_cache.get_or_set(key, lambda: TextAnalysis(article.title, article.text))
+
+
 def get_article_readtime(page, settings):
 
     article = get_article(page, settings)
     if article.text:
-        result = readtime.of_text(article.text)
+        analysis = get_text_analysis(page, settings)
+        with timer('read_time.compute'):
+            result = analysis.get_read_time()
         return str(result.text), {'read_time': str(result.text)}
 
     return 'No article found', {}
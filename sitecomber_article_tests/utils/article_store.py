@@ -0,0 +1,221 @@
+import os
+import json
+import time
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+
+import newspaper
+
+
+logger = logging.getLogger('django')
+
+# Bump STORE_FORMAT_VERSION whenever extraction logic changes so that stale
+# entries are ignored and purged on the next open.
+STORE_FORMAT_VERSION = 1
+EXTRACTOR_VERSION = u"%s:%s" % (STORE_FORMAT_VERSION, newspaper.__version__)
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Hits only refresh an entry's access time when it is older than this, so
+# most reads don't need SQLite's single write lock
+ACCESS_REFRESH_SECONDS = 60 * 60
+
+
+class StoredArticle(object):
+    """
+    Lightweight stand-in for a parsed newspaper Article, restored from the store.
+    """
+
+    def __init__(self, title=u'', text=u'', authors=None, publish_date=None, top_image=u'', imgs=None):
+        self.title = title
+        self.text = text
+        self.authors = authors or []
+        self.publish_date = publish_date
+        self.top_image = top_image
+        self.imgs = set(imgs or [])
+
+    @classmethod
+    def from_article(cls, article):
+        return cls(
+            title=article.title,
+            text=article.text,
+            authors=list(article.authors),
+            publish_date=article.publish_date,
+            top_image=article.top_image,
+            imgs=list(article.imgs)
+        )
+
+    def to_json(self):
+        return json.dumps({
+            'title': self.title,
+            'text': self.text,
+            'authors': self.authors,
+            'publish_date': None if not self.publish_date else self.publish_date.isoformat(),
+            'top_image': self.top_image,
+            'imgs': sorted(self.imgs)
+        }, separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, payload):
+        data = json.loads(payload)
+        publish_date = data.get('publish_date')
+        if publish_date:
+            publish_date = datetime.fromisoformat(publish_date)
+        return cls(
+            title=data.get('title', u''),
+            text=data.get('text', u''),
+            authors=data.get('authors'),
+            publish_date=publish_date,
+            top_image=data.get('top_image', u''),
+            imgs=data.get('imgs')
+        )
+
+
+class ArticleStore(object):
+    """
+    SQLite-backed store of extracted articles keyed by content digest,
+    language and extractor version. Least recently used entries are evicted
+    once the stored payloads exceed max_bytes.
+
+    The store is only a cache: SQLite errors (a locked, corrupt or read-only
+    file) are logged, and get and set then behave as a miss.
+    """
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES, version=EXTRACTOR_VERSION):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.version = version
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+
+    def _connect(self):
+        # Connections must not be shared across forked worker processes
+        if self._connection is None or self._pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("""CREATE TABLE IF NOT EXISTS articles (
+                digest TEXT NOT NULL,
+                language TEXT NOT NULL,
+                version TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (digest, language, version))""")
+            connection.execute("CREATE INDEX IF NOT EXISTS articles_accessed_at ON articles (accessed_at)")
+            connection.execute("DELETE FROM articles WHERE version != ?", (self.version,))
+            connection.commit()
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+
+    def get(self, digest, language):
+        try:
+            return self._get(digest, language)
+        except sqlite3.Error as e:
+            logger.error(u"Error reading from article store %s: %s" % (self.path, e))
+            return None
+
+    def set(self, digest, language, article):
+        try:
+            self._set(digest, language, article)
+        except sqlite3.Error as e:
+            logger.error(u"Error writing to article store %s: %s" % (self.path, e))
+
+    def _get(self, digest, language):
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute(
+                "SELECT payload, accessed_at FROM articles WHERE digest = ? AND language = ? AND version = ?",
+                (digest, language, self.version)
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            if now - row[1] > ACCESS_REFRESH_SECONDS:
+                connection.execute(
+                    "UPDATE articles SET accessed_at = ? WHERE digest = ? AND language = ? AND version = ?",
+                    (now, digest, language, self.version)
+                )
+                connection.commit()
+        return StoredArticle.from_json(row[0])
+
+    def _set(self, digest, language, article):
+        payload = StoredArticle.from_article(article).to_json()
+        size = len(payload.encode('utf-8'))
+        with self._lock:
+            connection = self._connect()
+            # Take the write lock before totalling, so writes from other
+            # processes sharing the file are counted
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                connection.execute(
+                    "INSERT OR REPLACE INTO articles (digest, language, version, payload, size, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (digest, language, self.version, payload, size, time.time())
+                )
+                total_bytes = self._get_total_bytes(connection)
+                if total_bytes > self.max_bytes:
+                    self._evict(connection, total_bytes)
+                connection.commit()
+            except BaseException:
+                connection.rollback()
+                raise
+
+    def _get_total_bytes(self, connection):
+        return connection.execute("SELECT COALESCE(SUM(size), 0) FROM articles").fetchone()[0]
+
+    def get_total_bytes(self):
+        with self._lock:
+            return self._get_total_bytes(self._connect())
+
+    def _evict(self, connection, total_bytes):
+        # Trim down to 90% of the budget so eviction doesn't run on every write
+        target = int(self.max_bytes * 0.9)
+        rows = connection.execute("SELECT rowid, size FROM articles ORDER BY accessed_at").fetchall()
+        evicted = []
+        for rowid, size in rows:
+            if total_bytes <= target:
+                break
+            evicted.append((rowid,))
+            total_bytes -= size
+        connection.executemany("DELETE FROM articles WHERE rowid = ?", evicted)
+        logger.debug(u"Evicted %s article(s) from article store %s" % (len(evicted), self.path))
+
+    def clear(self):
+        with self._lock:
+            connection = self._connect()
+            connection.execute("DELETE FROM articles")
+            connection.commit()
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+            self._connection = None
+
+
+_article_store = None
+
+
+def configure_article_store(path=None, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Enable the persistent article store at path, or disable it if path is None.
+    """
+    global _article_store
+    if _article_store is not None:
+        _article_store.close()
+    _article_store = None if not path else ArticleStore(path, max_bytes)
+    return _article_store
+
+
+def get_article_store():
+    return _article_store
+
+
+if os.environ.get('SITECOMBER_ARTICLE_STORE_PATH'):
+    configure_article_store(
+        os.environ['SITECOMBER_ARTICLE_STORE_PATH'],
+        int(os.environ.get('SITECOMBER_ARTICLE_STORE_MAX_BYTES', DEFAULT_MAX_BYTES))
+    )
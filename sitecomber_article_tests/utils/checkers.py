@@ -0,0 +1,73 @@
+import os
+import string
+import logging
+
+import spellchecker
+from spellchecker import SpellChecker
+
+from .lexicon import build_lexicon, open_lexicon
+
+
+logger = logging.getLogger('django')
+
+
+class LexiconChecker(object):
+    """
+    Membership-only replacement for SpellChecker.unknown() backed by a
+    compiled lexicon of pyspellchecker's word list. It skips loading word
+    frequencies since candidate generation is never needed.
+    """
+
+    def __init__(self, lexicon):
+        self.lexicon = lexicon
+
+    @staticmethod
+    def _should_check(word):
+        # Mirrors SpellChecker._check_if_should_check
+        if len(word) == 1 and word in string.punctuation:
+            return False
+        try:
+            float(word)
+            return False
+        except ValueError:
+            pass
+        return True
+
+    def unknown(self, words):
+        return set(word.lower() for word in words if self._should_check(word) and word.lower() not in self.lexicon)
+
+
+def get_checker_version(checker):
+    """
+    Identifies the word list a spell checker judges words by: the compiled
+    lexicon's version, or the checker class and pyspellchecker release
+    """
+    if isinstance(checker, LexiconChecker):
+        return (u"lexicon", checker.lexicon.version)
+    return (checker.__class__.__name__, getattr(spellchecker, '__version__', None))
+
+
+def get_spellchecker_lexicon_path(language):
+    lexicon_dir = os.environ.get('SITECOMBER_SPELLCHECKER_LEXICON_DIR')
+    if not lexicon_dir:
+        return None
+    return os.path.join(lexicon_dir, u"spellchecker-%s.lex" % (language))
+
+
+def build_spellchecker_lexicon(language, path):
+    spell = SpellChecker(language=language, distance=1)
+    return build_lexicon(spell.word_frequency.keys(), path)
+
+
+def load_spell_checker(language):
+    """
+    Loaded checkers are shared per language through the language registry,
+    see utils/languages.py
+    """
+    lexicon_path = get_spellchecker_lexicon_path(language)
+    if lexicon_path and os.path.exists(lexicon_path):
+        logger.debug(u"Loading membership-only spell checker for %s from %s" % (language, lexicon_path))
+        return LexiconChecker(open_lexicon(lexicon_path))
+
+    logger.debug(u"Loading spell checker for %s" % (language))
+    return SpellChecker(language=language, distance=1)
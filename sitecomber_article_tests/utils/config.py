@@ -0,0 +1,93 @@
+import json
+import logging
+from functools import lru_cache
+
+from .cache import LRUCache
+
+
+logger = logging.getLogger('django')
+
+DEFAULT_LANGUAGE = 'en'
+DEFAULT_PLACEHOLDER_WORDS = ['lorem', 'ipsum']
+
+SITE_CONFIG_CACHE_SIZE = 64
+site_config_cache = LRUCache(SITE_CONFIG_CACHE_SIZE)
+
+
+@lru_cache(maxsize=None)
+def get_article_languages():
+    from newspaper.utils import get_available_languages
+    return frozenset(get_available_languages())
+
+
+def get_settings_key(settings):
+    return json.dumps(settings or {}, sort_keys=True, default=str)
+
+
+class SiteConfig(object):
+    """
+    Everything the analyzers derive from a site test's settings, compiled once
+    per distinct settings JSON. Expensive parts are built on first use.
+    """
+
+    def __init__(self, settings, key=None):
+        self.settings = settings or {}
+        self.key = get_settings_key(self.settings) if key is None else key
+
+        self.spelling_language = self.settings.get('lang', DEFAULT_LANGUAGE)
+        self.placeholder_words = self.settings.get('placeholder_words', DEFAULT_PLACEHOLDER_WORDS)
+        self.known_words = self.settings.get('known_words', [])
+
+        self._language = None
+        self._placeholder_matcher = None
+
+    @property
+    def language(self):
+        """
+        The language newspaper parses articles with
+        """
+        if self._language is None:
+            language = self.spelling_language
+            if language not in get_article_languages():
+                logger.error(u"Language %s not found. Defaulting to '%s' instead." % (language, DEFAULT_LANGUAGE))
+                language = DEFAULT_LANGUAGE
+            self._language = language
+        return self._language
+
+    @property
+    def placeholder_matcher(self):
+        if self._placeholder_matcher is None:
+            from .article import get_placeholder_matcher
+            self._placeholder_matcher = get_placeholder_matcher(self.placeholder_words)
+        return self._placeholder_matcher
+
+    @property
+    def resources(self):
+        """
+        The spelling language's shared resources; looked up on every use, so
+        configs don't keep a language loaded once the registry unloads it
+        """
+        # Imported here, as the registry pulls in pyspellchecker
+        from .languages import get_language_resources
+        return get_language_resources(self.spelling_language)
+
+    @property
+    def dictionary(self):
+        return self.resources.get_dictionary(self.known_words)
+
+    @property
+    def affix_index(self):
+        return self.resources.get_affix_index(self.settings.get('affix_rules'))
+
+    @property
+    def stop_words(self):
+        return self.resources.stop_words
+
+
+def get_site_config(settings):
+    """
+    Returns the compiled configuration for settings; a new one is only built
+    when the settings JSON changes.
+    """
+    key = get_settings_key(settings)
+    return site_config_cache.get_or_set(key, lambda: SiteConfig(settings, key))
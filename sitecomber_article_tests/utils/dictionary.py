@@ -1,9 +1,234 @@
-from nltk.corpus import words
+import os
+import hashlib
+import logging
+from functools import lru_cache
+
+from .lexicon import open_lexicon, open_bundle, build_bundle
+
+
+logger = logging.getLogger('django')
 
 valid_one_letter_words = ['a', 'à', 'i', 'o']
 
+# The extended dictionary is English; other languages have no lexicon of
+# their own, so their spell checker decides alone
+EXTENDED_DICTIONARY_LANGUAGE = 'en'
+
+# Site language codes to NLTK stopword list names
+STOPWORD_LANGUAGES = {
+    'ar': 'arabic',
+    'az': 'azerbaijani',
+    'da': 'danish',
+    'de': 'german',
+    'el': 'greek',
+    'en': 'english',
+    'es': 'spanish',
+    'eu': 'basque',
+    'fi': 'finnish',
+    'fr': 'french',
+    'hu': 'hungarian',
+    'id': 'indonesian',
+    'it': 'italian',
+    'kk': 'kazakh',
+    'ne': 'nepali',
+    'nl': 'dutch',
+    'no': 'norwegian',
+    'pt': 'portuguese',
+    'ro': 'romanian',
+    'ru': 'russian',
+    'sl': 'slovene',
+    'sv': 'swedish',
+    'tg': 'tajik',
+    'tr': 'turkish',
+}
+
+# Prebuilt at release time from the NLTK corpora and the word lists below,
+# see build_dictionary_bundle
+DICTIONARY_BUNDLE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'dictionary.bundle')
+WORDS_SECTION = u'words'
+# Holds one word, the digest of the curated word lists the bundle was built with
+CURATED_DIGEST_SECTION = u'curated-digest'
+
+
+def get_words_digest(words):
+    digest = hashlib.sha1()
+    for word in sorted(words):
+        digest.update(word.encode('utf-8'))
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+
+class WordSet(frozenset):
+    """
+    Immutable word set with a version stamp, so results derived from it
+    (such as word simplifications) can be cached per dictionary. The stamp
+    is a content digest, so it is the same in every process.
+    """
+
+    @property
+    def version(self):
+        try:
+            return self._version
+        except AttributeError:
+            self._version = ('words', len(self), get_words_digest(self))
+            return self._version
+
+
+class DictionaryOverlay(object):
+    """
+    Read-only view of a shared base dictionary plus a small set of extra words.
+    """
+
+    def __init__(self, base, words):
+        self.base = base
+        self.words = frozenset(words)
+        self.version = (get_dictionary_version(base), get_words_digest(self.words))
+
+    def __contains__(self, word):
+        return word in self.words or word in self.base
+
+    def __len__(self):
+        return len(self.base) + sum(1 for word in self.words if word not in self.base)
+
+    def __iter__(self):
+        for word in self.base:
+            yield word
+        for word in self.words:
+            if word not in self.base:
+                yield word
+
+
+def get_dictionary_version(dictionary):
+    """
+    Returns a hashable version for dictionary, or None if it isn't versioned.
+    """
+    return getattr(dictionary, 'version', None)
+
+
+def get_stopwords_section(language_name):
+    return u"stopwords/%s" % (language_name)
+
+
+def get_dictionary_bundle_path():
+    return os.environ.get('SITECOMBER_DICTIONARY_BUNDLE', DICTIONARY_BUNDLE_PATH)
+
+
+@lru_cache(maxsize=None)
+def get_dictionary_bundle():
+    """
+    Returns the prebuilt dictionary bundle, or None if it hasn't been built.
+    Set SITECOMBER_DICTIONARY_BUNDLE to use another file, or to an empty
+    string to always read the NLTK corpora.
+    """
+    path = get_dictionary_bundle_path()
+    if not path or not os.path.exists(path):
+        return None
+    bundle = open_bundle(path)
+    if not is_bundle_current(bundle):
+        logger.warning(u"Dictionary bundle %s was built from other word lists than utils/dictionary.py; ignoring it. Rebuild it with: python -m sitecomber_article_tests.utils.lexicon build-bundle" % (path))
+        return None
+    return bundle
+
+
+def get_curated_digest():
+    return get_words_digest(set(get_curated_word_list()))
+
+
+def is_bundle_current(bundle):
+    """
+    False if the curated word lists have been edited since bundle was built
+    """
+    digest = bundle.get(CURATED_DIGEST_SECTION)
+    return digest is not None and get_curated_digest() in digest
+
+
+def get_bundle_sections():
+    from nltk.corpus import stopwords
+
+    sections = {WORDS_SECTION: get_extended_word_list(), CURATED_DIGEST_SECTION: [get_curated_digest()]}
+    for language_name in stopwords.fileids():
+        if language_name != 'README':
+            sections[get_stopwords_section(language_name)] = stopwords.words(language_name)
+    return sections
+
+
+def build_dictionary_bundle(path=None):
+    """
+    Compiles the extended word list and every NLTK stopword list into one
+    bundle, by default the one shipped with the package
+    """
+    return build_bundle(get_bundle_sections(), path or DICTIONARY_BUNDLE_PATH)
+
+
+def get_stopwords(language_name):
+    """
+    Loads the NLTK stopword list language_name, from the bundle if it has been built
+    """
+    bundle = get_dictionary_bundle()
+    section = get_stopwords_section(language_name)
+    if bundle is not None and section in bundle:
+        return frozenset(bundle.get(section))
+
+    from nltk.corpus import stopwords
+    return frozenset(stopwords.words(language_name))
+
+
+def load_stopwords(language):
+    """
+    Stopwords for a site language code, or none if NLTK has no list for it.
+    A missing corpus raises, like the lexicon, rather than leaving the
+    language without stopwords until the worker restarts.
+    """
+    language_name = STOPWORD_LANGUAGES.get(language)
+    if language_name is None:
+        logger.warning(u"No stopwords for language %s; checking every word." % (language))
+        return frozenset()
+    return get_stopwords(language_name)
+
+
+def load_lexicon(language):
+    """
+    The dictionary of known words for language; empty for languages other
+    than that of the extended dictionary
+    """
+    if language == EXTENDED_DICTIONARY_LANGUAGE:
+        return load_extended_dictionary()
+    return WordSet()
+
 
 def get_extended_dictionary():
+    """
+    The immutable extended dictionary, shared through the language registry
+    (see utils/languages.py)
+    """
+    from .languages import get_language_resources
+    return get_language_resources(EXTENDED_DICTIONARY_LANGUAGE).lexicon
+
+
+def load_extended_dictionary():
+    """
+    If SITECOMBER_LEXICON_PATH points at a compiled lexicon (see utils/lexicon.py)
+    it is memory-mapped, and otherwise the words are read from the dictionary
+    bundle when it has been built, or from the NLTK corpus.
+    """
+    lexicon_path = os.environ.get('SITECOMBER_LEXICON_PATH')
+    if lexicon_path:
+        return open_lexicon(lexicon_path)
+    bundle = get_dictionary_bundle()
+    if bundle is not None and WORDS_SECTION in bundle:
+        return bundle.get(WORDS_SECTION)
+    return WordSet(get_extended_word_list())
+
+
+def get_extended_word_list():
+    from nltk.corpus import words
+    return words.words() + get_curated_word_list()
+
+
+def get_curated_word_list():
+    """
+    Words missing from the NLTK corpus
+    """
     modern_technical_terminology = [
         "blog",
         "blogger",
@@ -187,4 +412,4 @@ def get_extended_dictionary():
 
     ]
 
-    return set(words.words() + modern_technical_terminology + modern_social_terminology + alternate_spellings + adopted_words)
+    return modern_technical_terminology + modern_social_terminology + alternate_spellings + adopted_words
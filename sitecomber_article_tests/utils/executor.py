@@ -0,0 +1,91 @@
+import sys
+import logging
+import importlib
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from .metrics import collect_page_timings, timer
+
+
+logger = logging.getLogger('django')
+
+# The only page attributes the analyzers read; cheap to send to a worker process
+PageSnapshot = namedtuple('PageSnapshot', ['url', 'last_text_content'])
+
+# Returned by a worker in place of the result of an analyzer that raised
+AnalyzerError = namedtuple('AnalyzerError', ['name', 'error'])
+
+# Analyzer modules pull in newspaper, nltk and pyspellchecker, so they are
+# only imported when an analyzer first runs
+ANALYZERS = {
+    'reader_view': ('article', 'is_reader_view_enabled'),
+    'placeholder_text': ('article', 'contains_placeholder_text'),
+    'read_time': ('article', 'get_article_readtime'),
+    'spelling': ('spelling', 'check_spelling'),
+    'meta_tags': ('seo', 'has_meta_tags'),
+    'social_meta_tags': ('seo', 'has_socialmedia_tags'),
+}
+
+
+def get_analyzer(name):
+    module_name, function_name = ANALYZERS[name]
+    module = importlib.import_module(u".%s" % (module_name), __package__)
+    return getattr(module, function_name)
+
+
+def run_analyzer(name, page, settings, *args):
+    with timer(u"analyzer.%s" % (name)):
+        return get_analyzer(name)(page, settings, *args)
+
+
+def analyze_page(url, html, analyses, collect_timings=False):
+    """
+    Worker entry point: runs each (analyzer name, settings, args) in analyses
+    against one page and returns the plain result tuples. Running all of a
+    page's analyzers in the same worker lets them share its parsed article.
+
+    With collect_timings, each result is returned as (result, timings), where
+    timings maps each stage to the seconds that analyzer spent in it. An
+    analyzer that raises is returned as an AnalyzerError, so the page's other
+    analyzers still report.
+    """
+    page = PageSnapshot(url, html)
+    results = []
+    for name, settings, args in analyses:
+        try:
+            if collect_timings:
+                with collect_page_timings() as timings:
+                    result = run_analyzer(name, page, settings, *args)
+                results.append((result, timings))
+            else:
+                results.append(run_analyzer(name, page, settings, *args))
+        except Exception as e:
+            results.append(AnalyzerError(name, u"%s: %s" % (e.__class__.__name__, e)))
+    return results
+
+
+def warm_worker(languages=('en',)):
+    """
+    Process pool initializer that loads corpora, the extended dictionary and
+    spell checkers before the worker receives its first page. It must not
+    raise, or the pool breaks for every analyzer; warm_up logs failures and
+    leaves those resources to load on first use.
+    """
+    from .warmup import warm_up
+    warm_up(languages)
+
+
+def create_page_executor(max_workers=None, max_tasks_per_child=None, languages=('en',)):
+    kwargs = {}
+    if max_tasks_per_child:
+        if sys.version_info >= (3, 11):
+            kwargs['max_tasks_per_child'] = max_tasks_per_child
+        else:
+            logger.warning(u"max_tasks_per_child requires Python 3.11 or later and will be ignored.")
+
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=warm_worker,
+        initargs=(tuple(languages),),
+        **kwargs
+    )
@@ -0,0 +1,247 @@
+"""
+Per-language spelling resources: the lexicon of known words, stopwords,
+affix rules and spell checker. Each is loaded the first time a site in that
+language needs it, and languages stay resident in a least-recently-used
+registry bounded by their estimated size in bytes:
+
+    export SITECOMBER_LANGUAGE_RESOURCES_MAX_BYTES=268435456
+
+Print what a worker would hold after loading some languages with:
+
+    python -m sitecomber_article_tests.utils.languages en es fr
+
+"""
+import os
+import sys
+import logging
+import threading
+from itertools import islice
+from collections import OrderedDict
+
+from .affixes import get_affix_index
+from .cache import LRUCache
+from .checkers import LexiconChecker, load_spell_checker
+from .dictionary import DictionaryOverlay, load_lexicon, load_stopwords
+from .metrics import increment, timer
+
+
+logger = logging.getLogger('django')
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+SITE_DICTIONARY_CACHE_SIZE = 64
+SIZE_SAMPLE = 1000
+
+RESOURCES = ['stop_words', 'lexicon', 'affix_index', 'spell_checker']
+
+
+def estimate_collection_size(values):
+    """
+    Container size plus the average size of a sample of its items
+    """
+    size = sys.getsizeof(values)
+    sample = list(islice(values, SIZE_SAMPLE))
+    if sample:
+        size += len(values) * sum(sys.getsizeof(value) for value in sample) // len(sample)
+    return size
+
+
+def estimate_size(resource):
+    """
+    Approximate bytes held by a loaded resource. Memory-mapped lexicons count
+    their mapped size, though it is shared between processes.
+    """
+    if isinstance(resource, LexiconChecker):
+        return resource.lexicon.size
+    if hasattr(resource, 'word_frequency'):
+        return estimate_collection_size(resource.word_frequency.dictionary)
+    if isinstance(resource, (set, frozenset, dict)):
+        return estimate_collection_size(resource)
+    return getattr(resource, 'size', 0)
+
+
+class LanguageResources(object):
+    """
+    One language's spelling resources, each loaded on first use. Sites layer
+    their known words and affix rules over them with get_dictionary and
+    get_affix_index.
+    """
+
+    def __init__(self, language, on_load=None):
+        self.language = language
+        self.sizes = {}
+        self._resources = {}
+        self._on_load = on_load
+        self._lock = threading.RLock()
+        self._dictionaries = LRUCache(SITE_DICTIONARY_CACHE_SIZE)
+
+    def _get(self, name, loader):
+        resource = self._resources.get(name)
+        if resource is None:
+            with self._lock:
+                # Another thread may have loaded it while we waited on the lock
+                resource = self._resources.get(name)
+                if resource is None:
+                    logger.debug(u"Loading %s for %s" % (name, self.language))
+                    with timer(u"language.%s" % (name)):
+                        resource = loader(self.language)
+                    self.sizes[name] = estimate_size(resource)
+                    self._resources[name] = resource
+            if self._on_load is not None:
+                self._on_load(self)
+        return resource
+
+    @property
+    def stop_words(self):
+        return self._get('stop_words', load_stopwords)
+
+    @property
+    def lexicon(self):
+        return self._get('lexicon', load_lexicon)
+
+    @property
+    def affix_index(self):
+        return self._get('affix_index', lambda language: get_affix_index(None, language))
+
+    @property
+    def spell_checker(self):
+        return self._get('spell_checker', load_spell_checker)
+
+    def get_dictionary(self, known_words=None):
+        """
+        The lexicon overlaid with a site's known words. Overlays are compiled
+        once per distinct list of known words.
+        """
+        if not known_words:
+            return self.lexicon
+
+        key = frozenset(known_words)
+        return self._dictionaries.get_or_set(key, lambda: DictionaryOverlay(self.lexicon, key))
+
+    def get_affix_index(self, affix_rules=None):
+        if not affix_rules:
+            return self.affix_index
+        return get_affix_index(affix_rules, self.language)
+
+    def load(self):
+        for name in RESOURCES:
+            getattr(self, name)
+        return self
+
+    @property
+    def size(self):
+        return sum(self.sizes.values())
+
+
+class LanguageRegistry(object):
+    """
+    Keeps LanguageResources per language, dropping the least recently used
+    languages once their estimated size exceeds max_bytes. The language that
+    is loading is always kept, even if it alone exceeds max_bytes.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._languages = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __contains__(self, language):
+        return language in self._languages
+
+    def get(self, language):
+        with self._lock:
+            resources = self._languages.get(language)
+            if resources is None:
+                resources = self._languages[language] = LanguageResources(language, on_load=self._trim)
+            self._languages.move_to_end(language)
+            return resources
+
+    def _trim(self, loaded):
+        with self._lock:
+            if self.max_bytes is None:
+                return
+            for language, resources in list(self._languages.items()):
+                if self.get_size() <= self.max_bytes:
+                    break
+                if resources is loaded:
+                    continue
+                logger.info(u"Unloading spelling resources for %s (%s bytes)" % (language, resources.size))
+                del self._languages[language]
+                self.evictions += 1
+                increment('language.evictions')
+
+            if self.get_size() > self.max_bytes:
+                logger.warning(u"Spelling resources take %s bytes, more than the limit of %s" % (self.get_size(), self.max_bytes))
+
+    def get_size(self):
+        with self._lock:
+            return sum(resources.size for resources in self._languages.values())
+
+    def evict(self, language=None):
+        with self._lock:
+            if language is None:
+                self._languages.clear()
+            else:
+                self._languages.pop(language, None)
+
+    def info(self):
+        """
+        Resident languages, least recently used first, with the estimated
+        bytes of each loaded resource
+        """
+        with self._lock:
+            return {
+                'max_bytes': self.max_bytes,
+                'size': self.get_size(),
+                'evictions': self.evictions,
+                'languages': [
+                    {'language': language, 'size': resources.size, 'resources': dict(resources.sizes)}
+                    for language, resources in self._languages.items()
+                ],
+            }
+
+
+language_registry = LanguageRegistry()
+
+
+def configure_language_registry(max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Replaces the registry, unloading every language; None removes the limit
+    """
+    global language_registry
+    language_registry = LanguageRegistry(max_bytes)
+
+
+def get_language_registry():
+    return language_registry
+
+
+def get_language_resources(language):
+    return language_registry.get(language)
+
+
+def get_resident_languages():
+    return language_registry.info()
+
+
+def format_resident_languages(info=None):
+    info = get_resident_languages() if info is None else info
+    lines = []
+    for entry in info['languages']:
+        resources = u", ".join(u"%s %.1f MB" % (name, size / 1048576.0) for name, size in sorted(entry['resources'].items()))
+        lines.append(u"%-8s %9.1f MB  (%s)" % (entry['language'], entry['size'] / 1048576.0, resources))
+    lines.append(u"%-8s %9.1f MB of %s" % (
+        u"total", info['size'] / 1048576.0,
+        u"unlimited" if info['max_bytes'] is None else u"%.1f MB" % (info['max_bytes'] / 1048576.0)
+    ))
+    return u"\n".join(lines)
+
+
+if os.environ.get('SITECOMBER_LANGUAGE_RESOURCES_MAX_BYTES'):
+    configure_language_registry(int(os.environ['SITECOMBER_LANGUAGE_RESOURCES_MAX_BYTES']))
+
+
+if __name__ == '__main__':
+    for language in sys.argv[1:] or ['en']:
+        get_language_resources(language).load()
+    print(format_resident_languages())
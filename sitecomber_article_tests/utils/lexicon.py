@@ -0,0 +1,269 @@
+"""
+Compact, memory-mapped word lexicon.
+
+A lexicon file is a sorted string table: a small header, an array of
+offsets and the UTF-8 encoded words sorted bytewise. Files are opened
+read-only with mmap so every worker process on a host shares one physical
+copy through the page cache.
+
+Build a lexicon from the extended dictionary with:
+
+    python -m sitecomber_article_tests.utils.lexicon build dictionary.lex
+
+or a membership-only lexicon of pyspellchecker's word list with:
+
+    python -m sitecomber_article_tests.utils.lexicon build-spellchecker en spellchecker-en.lex
+
+A bundle holds several named lexicons (the extended dictionary and the
+stopword lists) in one file, stamped with a digest of its contents. The
+bundle shipped with the package is built with:
+
+    python -m sitecomber_article_tests.utils.lexicon build-bundle
+
+"""
+import os
+import sys
+import mmap
+import struct
+import hashlib
+import threading
+
+
+MAGIC = b'SCLX'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sIII')
+
+BUNDLE_MAGIC = b'SCLB'
+BUNDLE_FORMAT_VERSION = 1
+# magic, format version, section count, sha1 of the sections
+BUNDLE_HEADER = struct.Struct('<4sII20s')
+# section name, offset from the start of the file, size
+BUNDLE_SECTION = struct.Struct('<64sII')
+
+
+class Lexicon(object):
+    """
+    Read-only sorted word table supporting membership and prefix lookups.
+    """
+
+    def __init__(self, buffer, offset=0, version=None):
+        magic, format_version, count, blob_size = HEADER.unpack_from(buffer, offset)
+        if magic != MAGIC:
+            raise ValueError(u"Not a lexicon file")
+        if format_version != FORMAT_VERSION:
+            raise ValueError(u"Unsupported lexicon version %s" % (format_version))
+
+        offsets_start = offset + HEADER.size
+        blob_start = offsets_start + (count + 1) * 4
+        self._buffer = buffer
+        self._count = count
+        self._blob_start = blob_start
+        if sys.byteorder == 'little':
+            self._offsets = memoryview(buffer)[offsets_start:blob_start].cast('I')
+        else:
+            self._offsets = struct.unpack_from('<%sI' % (count + 1), buffer, offsets_start)
+        self.size = blob_start + blob_size - offset
+        self._version = version
+
+    @property
+    def version(self):
+        """
+        A digest of the table, so rebuilt lexicons with different words never
+        share cached verdicts. Computed on first use, as it reads every page.
+        """
+        if self._version is None:
+            start = self._blob_start - (self._count + 1) * 4
+            digest = hashlib.sha1(memoryview(self._buffer)[start:start + self.size - HEADER.size])
+            self._version = (MAGIC, FORMAT_VERSION, digest.hexdigest())
+        return self._version
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._count
+        if index < 0 or index >= self._count:
+            raise IndexError(index)
+        return self._buffer[self._blob_start + self._offsets[index]:self._blob_start + self._offsets[index + 1]]
+
+    def _bisect(self, key):
+        # Inlined binary search; this is on the spell-checking hot path
+        buffer, offsets, start = self._buffer, self._offsets, self._blob_start
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if buffer[start + offsets[mid]:start + offsets[mid + 1]] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def __contains__(self, word):
+        if not isinstance(word, str):
+            return False
+        key = word.encode('utf-8')
+        index = self._bisect(key)
+        return index < self._count and self[index] == key
+
+    def __iter__(self):
+        for index in range(self._count):
+            yield self[index].decode('utf-8')
+
+    def has_prefix(self, prefix):
+        key = prefix.encode('utf-8')
+        index = self._bisect(key)
+        return index < self._count and self[index].startswith(key)
+
+    def iter_prefix(self, prefix):
+        key = prefix.encode('utf-8')
+        index = self._bisect(key)
+        while index < self._count:
+            word = self[index]
+            if not word.startswith(key):
+                break
+            yield word.decode('utf-8')
+            index += 1
+
+
+def pack_lexicon(words):
+    """
+    Returns the binary lexicon table for an iterable of words.
+    """
+    encoded = sorted(set(word.encode('utf-8') for word in words if word))
+    offsets = [0]
+    for word in encoded:
+        offsets.append(offsets[-1] + len(word))
+    blob = b''.join(encoded)
+    return HEADER.pack(MAGIC, FORMAT_VERSION, len(encoded), len(blob)) + \
+        struct.pack('<%sI' % (len(offsets)), *offsets) + blob
+
+
+def build_lexicon(words, path):
+    # Write to a temporary file first so readers never see a partial lexicon
+    tmp_path = u"%s.tmp" % (path)
+    with open(tmp_path, 'wb') as f:
+        f.write(pack_lexicon(words))
+    os.replace(tmp_path, path)
+    return path
+
+
+class LexiconBundle(object):
+    """
+    Read-only set of named lexicons stored in one buffer.
+    """
+
+    def __init__(self, buffer):
+        magic, version, count, digest = BUNDLE_HEADER.unpack_from(buffer, 0)
+        if magic != BUNDLE_MAGIC:
+            raise ValueError(u"Not a lexicon bundle")
+        if version != BUNDLE_FORMAT_VERSION:
+            raise ValueError(u"Unsupported lexicon bundle version %s" % (version))
+
+        self.version = digest.hex()
+        self._sections = {}
+        for index in range(count):
+            name, offset, size = BUNDLE_SECTION.unpack_from(buffer, BUNDLE_HEADER.size + index * BUNDLE_SECTION.size)
+            name = name.rstrip(b'\0').decode('utf-8')
+            # Sections are versioned by the bundle digest, so they aren't hashed again
+            self._sections[name] = Lexicon(buffer, offset, ('bundle', self.version, name))
+
+    def __contains__(self, name):
+        return name in self._sections
+
+    def __iter__(self):
+        return iter(sorted(self._sections))
+
+    def get(self, name):
+        return self._sections.get(name)
+
+
+def pack_bundle(sections):
+    """
+    Returns the binary bundle for a dict of {section name: iterable of words}.
+    """
+    names = sorted(sections)
+    tables = [pack_lexicon(sections[name]) for name in names]
+
+    digest = hashlib.sha1()
+    entries = []
+    offset = BUNDLE_HEADER.size + len(names) * BUNDLE_SECTION.size
+    for name, table in zip(names, tables):
+        encoded_name = name.encode('utf-8')
+        if len(encoded_name) > BUNDLE_SECTION.size - 8:
+            raise ValueError(u"Section name too long: %s" % (name))
+        digest.update(encoded_name + b'\0' + table)
+        # Keep each table's offset array 4-byte aligned
+        offset += -offset % 4
+        entries.append((encoded_name, offset, table))
+        offset += len(table)
+
+    chunks = [BUNDLE_HEADER.pack(BUNDLE_MAGIC, BUNDLE_FORMAT_VERSION, len(names), digest.digest())]
+    chunks.extend(BUNDLE_SECTION.pack(encoded_name, offset, len(table)) for encoded_name, offset, table in entries)
+    position = BUNDLE_HEADER.size + len(names) * BUNDLE_SECTION.size
+    for encoded_name, offset, table in entries:
+        chunks.append(b'\0' * (offset - position))
+        chunks.append(table)
+        position = offset + len(table)
+    return b''.join(chunks)
+
+
+def build_bundle(sections, path):
+    directory = os.path.dirname(os.path.abspath(path))
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    tmp_path = u"%s.tmp" % (path)
+    with open(tmp_path, 'wb') as f:
+        f.write(pack_bundle(sections))
+    os.replace(tmp_path, path)
+    return path
+
+
+_open_lexicons = {}
+_open_bundles = {}
+_open_lock = threading.Lock()
+
+
+def open_lexicon(path):
+    """
+    Memory-maps the lexicon at path. Each file is mapped once per process.
+    """
+    path = os.path.abspath(path)
+    with _open_lock:
+        if path not in _open_lexicons:
+            with open(path, 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            _open_lexicons[path] = Lexicon(mapped)
+        return _open_lexicons[path]
+
+
+def open_bundle(path):
+    """
+    Memory-maps the lexicon bundle at path. Each file is mapped once per process.
+    """
+    path = os.path.abspath(path)
+    with _open_lock:
+        if path not in _open_bundles:
+            with open(path, 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            _open_bundles[path] = LexiconBundle(mapped)
+        return _open_bundles[path]
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3 and sys.argv[1] == 'build':
+        from .dictionary import get_extended_word_list
+        output_path = build_lexicon(get_extended_word_list(), sys.argv[2])
+    elif len(sys.argv) == 4 and sys.argv[1] == 'build-spellchecker':
+        from .checkers import build_spellchecker_lexicon
+        output_path = build_spellchecker_lexicon(sys.argv[2], sys.argv[3])
+    elif len(sys.argv) in (2, 3) and sys.argv[1] == 'build-bundle':
+        from .dictionary import build_dictionary_bundle
+        output_path = build_dictionary_bundle(sys.argv[2] if len(sys.argv) == 3 else None)
+    else:
+        print(u"Usage: python -m sitecomber_article_tests.utils.lexicon build <output path>")
+        print(u"       python -m sitecomber_article_tests.utils.lexicon build-spellchecker <language> <output path>")
+        print(u"       python -m sitecomber_article_tests.utils.lexicon build-bundle [<output path>]")
+        sys.exit(1)
+
+    print(u"Wrote %s (%s bytes)" % (output_path, os.path.getsize(output_path)))
@@ -0,0 +1,147 @@
+"""
+Per-stage timers and counters for the analyzers' hot paths.
+
+Every process keeps cumulative totals (see get_metrics_snapshot) and forwards
+each measurement to a sink, which does nothing unless one is configured:
+
+    from sitecomber_article_tests.utils.metrics import configure_metrics, StatsdSink
+    configure_metrics(StatsdSink(statsd.StatsClient()))
+
+Worker processes keep their own totals; configure the sink in each worker
+(a process pool initializer, or before forking) to collect them centrally.
+"""
+import time
+import threading
+from contextlib import contextmanager
+
+
+class NullSink(object):
+
+    def timing(self, name, seconds):
+        pass
+
+    def increment(self, name, value=1):
+        pass
+
+
+class StatsdSink(object):
+    """
+    Forwards to a statsd client (anything with timing(name, ms) and incr(name, count))
+    """
+
+    def __init__(self, client, prefix='sitecomber_article_tests'):
+        self.client = client
+        self.prefix = prefix
+
+    def timing(self, name, seconds):
+        self.client.timing(u"%s.%s" % (self.prefix, name), seconds * 1000)
+
+    def increment(self, name, value=1):
+        self.client.incr(u"%s.%s" % (self.prefix, name), value)
+
+
+class PrometheusSink(object):
+    """
+    Records stage timings in a Histogram and counts in a Counter, both
+    labelled by stage name. Requires prometheus_client.
+    """
+
+    def __init__(self, namespace='sitecomber_article_tests', registry=None):
+        from prometheus_client import Counter, Histogram, REGISTRY
+
+        registry = REGISTRY if registry is None else registry
+        self.histogram = Histogram('stage_seconds', 'Time spent per stage', ['stage'], namespace=namespace, registry=registry)
+        self.counter = Counter('events', 'Counts per event', ['event'], namespace=namespace, registry=registry)
+
+    def timing(self, name, seconds):
+        self.histogram.labels(stage=name).observe(seconds)
+
+    def increment(self, name, value=1):
+        self.counter.labels(event=name).inc(value)
+
+
+_lock = threading.Lock()
+_local = threading.local()
+_sink = NullSink()
+_timers = {}
+_counters = {}
+
+
+def configure_metrics(sink=None):
+    """
+    Send measurements to sink, or discard them if sink is None
+    """
+    global _sink
+    _sink = NullSink() if sink is None else sink
+
+
+def get_metrics_sink():
+    return _sink
+
+
+def record_timing(name, seconds):
+    with _lock:
+        timer = _timers.get(name)
+        if timer is None:
+            timer = _timers[name] = [0, 0.0]
+        timer[0] += 1
+        timer[1] += seconds
+
+    collectors = getattr(_local, 'collectors', None)
+    if collectors:
+        for collector in collectors:
+            collector[name] = collector.get(name, 0.0) + seconds
+
+    _sink.timing(name, seconds)
+
+
+def increment(name, value=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+    _sink.increment(name, value)
+
+
+@contextmanager
+def timer(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(name, time.perf_counter() - start)
+
+
+@contextmanager
+def collect_page_timings():
+    """
+    Collects the seconds spent per stage by this thread while active:
+
+        with collect_page_timings() as timings:
+            check_spelling(page, settings)
+    """
+    collectors = getattr(_local, 'collectors', None)
+    if collectors is None:
+        collectors = _local.collectors = []
+    timings = {}
+    collectors.append(timings)
+    try:
+        yield timings
+    finally:
+        collectors.remove(timings)
+
+
+def get_metrics_snapshot():
+    """
+    Cumulative totals for this process:
+    {'timers': {name: {'count', 'seconds'}}, 'counters': {name: value}}
+    """
+    with _lock:
+        return {
+            'timers': dict((name, {'count': count, 'seconds': seconds}) for name, (count, seconds) in _timers.items()),
+            'counters': dict(_counters),
+        }
+
+
+def reset_metrics():
+    with _lock:
+        _timers.clear()
+        _counters.clear()
@@ -0,0 +1,136 @@
+"""
+Keeps stored result data small. A payload policy decides how much of large
+values (the article text, image and misspelling lists) is kept:
+
+    full     everything, as before
+    excerpt  the first excerpt_length characters or items, with lengths and hashes
+    summary  only lengths, counts and hashes
+
+Result data is serialized as compact JSON, optionally with orjson, and large
+payloads can be stored zlib-compressed inside a small JSON wrapper.
+"""
+import json
+import zlib
+import base64
+import logging
+
+from .cache import get_content_hash
+
+
+logger = logging.getLogger('django')
+
+PAYLOAD_FULL = 'full'
+PAYLOAD_EXCERPT = 'excerpt'
+PAYLOAD_SUMMARY = 'summary'
+PAYLOAD_POLICIES = (PAYLOAD_FULL, PAYLOAD_EXCERPT, PAYLOAD_SUMMARY)
+
+DEFAULT_EXCERPT_LENGTH = 500
+DEFAULT_EXCERPT_ITEMS = 20
+
+JSON_ENCODERS = ('json', 'orjson')
+COMPRESSION = 'zlib'
+
+# Compressed payloads keep these keys readable, so stored results can still be
+# matched on them (see has_current_result in tests.py)
+UNCOMPRESSED_KEYS = ('fingerprint',)
+
+
+def validate_payload_policy(policy):
+    if policy not in PAYLOAD_POLICIES:
+        logger.error(u"Unknown payload policy %s, expected one of %s; storing full payloads." % (policy, u", ".join(PAYLOAD_POLICIES)))
+        return PAYLOAD_FULL
+    return policy
+
+
+def add_text(data, key, text, policy=PAYLOAD_FULL, excerpt_length=DEFAULT_EXCERPT_LENGTH):
+    """
+    Stores text under key, or its length, hash and (for excerpts) its start
+    under key_length, key_hash and key_excerpt
+    """
+    if policy == PAYLOAD_FULL:
+        data[key] = text
+        return data
+
+    text = text or u""
+    data[u"%s_length" % (key)] = len(text)
+    data[u"%s_hash" % (key)] = get_content_hash(text)
+    if policy == PAYLOAD_EXCERPT:
+        data[u"%s_excerpt" % (key)] = text[:excerpt_length]
+    return data
+
+
+def add_list(data, key, values, policy=PAYLOAD_FULL, excerpt_items=DEFAULT_EXCERPT_ITEMS):
+    """
+    Stores values under key, or their count and (for excerpts) the first
+    excerpt_items under key_count and key_excerpt
+    """
+    values = list(values)
+    if policy == PAYLOAD_FULL:
+        data[key] = values
+        return data
+
+    data[u"%s_count" % (key)] = len(values)
+    if policy == PAYLOAD_EXCERPT:
+        data[u"%s_excerpt" % (key)] = values[:excerpt_items]
+    return data
+
+
+_orjson = None
+
+
+def get_orjson():
+    global _orjson
+    if _orjson is None:
+        try:
+            import orjson
+            _orjson = orjson
+        except ImportError:
+            logger.warning(u"orjson is not installed; falling back to json for result data.")
+            _orjson = False
+    return _orjson
+
+
+def dumps_json(data, encoder='json'):
+    """
+    Compact, key-sorted JSON; the orjson encoder is used only if it is
+    installed
+    """
+    if encoder == 'orjson':
+        orjson = get_orjson()
+        if orjson:
+            try:
+                return orjson.dumps(data, option=orjson.OPT_SORT_KEYS).decode('utf-8')
+            except TypeError:
+                # Fall through to json for values orjson does not handle
+                pass
+    return json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+
+def compress_payload(data, dumped):
+    wrapper = dict((key, data[key]) for key in UNCOMPRESSED_KEYS if key in data)
+    wrapper['compressed'] = COMPRESSION
+    wrapper['payload'] = base64.b64encode(zlib.compress(dumped.encode('utf-8'))).decode('ascii')
+    return wrapper
+
+
+def dumps_payload(data, encoder='json', compress_min_bytes=None):
+    """
+    Serializes result data, compressing it when the JSON is at least
+    compress_min_bytes long and compression actually makes it smaller
+    """
+    dumped = dumps_json(data, encoder)
+    if compress_min_bytes is not None and len(dumped) >= compress_min_bytes and isinstance(data, dict):
+        compressed = dumps_json(compress_payload(data, dumped), encoder)
+        if len(compressed) < len(dumped):
+            return compressed
+    return dumped
+
+
+def loads_payload(dumped):
+    """
+    Reverses dumps_payload, decompressing wrapped payloads
+    """
+    data = json.loads(dumped)
+    if isinstance(data, dict) and data.get('compressed') == COMPRESSION and 'payload' in data:
+        return json.loads(zlib.decompress(base64.b64decode(data['payload'])).decode('utf-8'))
+    return data
@@ -1,5 +1,10 @@
 import re
-from bs4 import BeautifulSoup
+
+import lxml.etree
+import lxml.html
+
+from .cache import LRUCache, get_content_hash
+from .metrics import increment, timer
 
 """
 Moz's Recommendations:
@@ -13,34 +18,163 @@ characters.">
 
 """
 
+META_KEY_ATTRIBUTES = ['name', 'property', 'itemprop', 'http-equiv']
+
+
+class MetaIndex(object):
+    """
+    The page title and the content of the first <meta> tag for each name,
+    property, itemprop and http-equiv value (case-insensitive).
+    """
+
+    def __init__(self, title=None, meta=None):
+        self.title = title
+        self.meta = meta or {}
+
+    def get(self, attribute, value):
+        return self.meta.get((attribute, value.lower()))
+
+
+def parse_html(html):
+    try:
+        return lxml.html.document_fromstring(html)
+    except ValueError:
+        # lxml refuses unicode strings that carry an XML encoding declaration
+        return lxml.html.document_fromstring(html.encode('utf-8'))
+
+
+def add_meta_element(index, element):
+    if element.tag == 'title':
+        if index.title is None:
+            index.title = u"".join(element.itertext())
+        return
+
+    for attribute in META_KEY_ATTRIBUTES:
+        value = element.get(attribute)
+        if value is not None:
+            index.meta.setdefault((attribute, value.lower()), element.get('content'))
+
+
+def build_full_meta_index(html):
+    """
+    Parses the whole document and indexes every <title> and <meta> in a
+    single traversal.
+    """
+    index = MetaIndex()
+    if not html:
+        return index
+
+    try:
+        document = parse_html(html)
+    except (lxml.etree.ParserError, lxml.etree.XMLSyntaxError):
+        return index
+
+    for element in document.iter('meta', 'title'):
+        add_meta_element(index, element)
+    return index
+
+
+HEAD_CHUNK_SIZE = 16384
+late_meta_re = re.compile(r"<(?:meta|title)\b", re.IGNORECASE)
+
+
+def build_head_meta_index(html, chunk_size=HEAD_CHUNK_SIZE):
+    """
+    Feeds html to an incremental parser a chunk at a time and stops at
+    </head> or the start of the body, so large bodies are never parsed.
+    Returns None when the unread rest of the page may hold more <meta> or
+    <title> tags and a full parse is needed.
+    """
+    index = MetaIndex()
+    parser = lxml.etree.HTMLPullParser(events=('start', 'end'))
+    position = 0
+    finished = False
+
+    while not finished and position < len(html):
+        parser.feed(html[position:position + chunk_size])
+        position += chunk_size
+        if position >= len(html):
+            parser.close()
+
+        # Every element in the chunk fed so far is handled before stopping, so
+        # only the unread rest of the page needs checking afterwards
+        for event, element in parser.read_events():
+            if event == 'end' and element.tag in ('meta', 'title'):
+                add_meta_element(index, element)
+            elif (event, element.tag) in (('end', 'head'), ('start', 'body')):
+                finished = True
+
+    if position < len(html):
+        # The parser holds back a tag that was cut off at the end of a chunk
+        unread = html.rfind('<', 0, position)
+        if late_meta_re.search(html, unread if unread >= 0 else position):
+            return None
+    return index
+
+
+def build_meta_index(html):
+    """
+    Indexes <title> and <meta> tags from the document head, falling back to
+    a full parse when they also appear further down the page.
+    """
+    if not html:
+        return MetaIndex()
+
+    try:
+        with timer('seo.head_parse'):
+            index = build_head_meta_index(html)
+    except (lxml.etree.ParserError, lxml.etree.XMLSyntaxError):
+        index = None
+
+    if index is None:
+        increment('seo.full_parse')
+        with timer('seo.full_parse'):
+            index = build_full_meta_index(html)
+    return index
+
+
+# Both SEO tests read the same index for a page
+META_INDEX_CACHE_SIZE = 32
+meta_index_cache = LRUCache(META_INDEX_CACHE_SIZE)
+
+
+def get_meta_index(page):
+    html = page.last_text_content
+    cache_key = (page.url, get_content_hash(html))
+    meta_index = meta_index_cache.get(cache_key)
+    if meta_index is not None:
+        increment('seo.cache_hit')
+        return meta_index
+    increment('seo.cache_miss')
+
+    meta_index = build_meta_index(html)
+    meta_index_cache.set(cache_key, meta_index)
+    return meta_index
+
+
 def has_meta_tags(page, settings):
 
-    soup = BeautifulSoup(page.last_text_content)
+    meta_index = get_meta_index(page)
     meta_tags_correct = False
     messages = []
     data = {}
 
-    contentTypeTag = soup.find('meta', attrs={'http-equiv': 'Content-Type'}) \
-        or soup.find('meta', attrs={'http-equiv': 'content-type'})
-    contentType = None if not contentTypeTag else contentTypeTag["content"]
+    contentType = meta_index.get('http-equiv', 'Content-Type')
     if not contentType:
         status = "warning"
         messages.append(u"Page is missing the recommended Content-Type meta tag.")
 
-    viewportTag = soup.find('meta', attrs={'name': 'viewport'})
-    viewport = None if not viewportTag else viewportTag["content"]
+    viewport = meta_index.get('name', 'viewport')
     if not viewport:
         status = "warning"
         messages.append(u"Page is missing the recommended viewport meta tag.")
 
-    titleTag = soup.find('title')
-    title = None if not titleTag else titleTag.text
+    title = meta_index.title
     if not title:
         status = "error"
         messages.append(u"Page is missing the title tag.")
 
-    descriptionTag = soup.find('meta', attrs={'name': 'description'})
-    description = None if not descriptionTag else descriptionTag["content"]
+    description = meta_index.get('name', 'description')
     if not description:
         status = "error"
         messages.append(u"Page is missing the description meta tag.")
@@ -108,7 +242,7 @@ Social Media Tags:
 
 def has_socialmedia_tags(page, settings):
 
-    soup = BeautifulSoup(page.last_text_content)
+    meta_index = get_meta_index(page)
     social_tags_correct = True
     status = "success"
     messages = []
@@ -120,12 +254,11 @@ def has_socialmedia_tags(page, settings):
 
 
     for tagAttrs in minimum_tags:
-        foundTag = soup.find('meta', attrs=tagAttrs)
-        foundTagContent = None if not foundTag else foundTag["content"]
+        tagKey = next(iter(tagAttrs))
+        foundTagContent = meta_index.get(tagKey, tagAttrs[tagKey])
         if not foundTagContent:
             social_tags_correct = False
             status = "error"
-            tagKey = next(iter(tagAttrs))
             tagAttrFormatted = "%s__%s"%(tagKey, tagAttrs[tagKey].replace(':', ''))
             messages.append(u"Recommended social meta tag %s was not found." % (tagAttrFormatted))
     if social_tags_correct:
@@ -146,9 +279,7 @@ def has_socialmedia_tags(page, settings):
     for tagAttrs in all_tags:
         tagKey = next(iter(tagAttrs))
         tagAttrFormatted = "%s__%s"%(tagKey, tagAttrs[tagKey].replace(':', ''))
-        foundTag = soup.find('meta', attrs=tagAttrs)
-        foundTagContent = None if not foundTag else foundTag["content"]
-        data[tagAttrFormatted] = foundTagContent
+        data[tagAttrFormatted] = meta_index.get(tagKey, tagAttrs[tagKey])
 
     message = u" ".join(messages)
     return social_tags_correct, status, message, data
@@ -3,34 +3,43 @@ import re
 from string import punctuation
 import unicodedata
 
-from nltk.corpus import stopwords
-
 import contractions
 
-from spellchecker import SpellChecker
-
-from .article import get_article
-from .dictionary import get_extended_dictionary, valid_one_letter_words
+from .article import get_article, get_text_analysis
+from .affixes import default_affix_index
+from .cache import LRUCache
+from .checkers import get_checker_version
+from .config import get_site_config
+from .metrics import increment, timer
+from .payload import PAYLOAD_FULL, add_list
+from .dictionary import get_dictionary_version, valid_one_letter_words
+from .languages import get_language_resources
+from .verdicts import KNOWN, PROPER_NOUN, misspelled_verdict, get_misspelled_root, get_verdict_scope, get_word_verdict_cache
 
 
 logger = logging.getLogger('django')
 
+# Word -> root results, keyed by dictionary version
+SIMPLIFY_CACHE_SIZE = 50000
+simplify_cache = LRUCache(SIMPLIFY_CACHE_SIZE)
+MAX_SIMPLIFICATION_DEPTH = 16
 
-def check_spelling(page, settings):
-    # Validate that this is for English; currently only English is supported
-    language = 'en' if 'lang' not in settings else settings['lang']
 
-    article = get_article(page, settings)
-    custom_known_words = [] if 'known_words' not in settings else settings['known_words']
+def check_spelling(page, settings, payload=PAYLOAD_FULL):
+    config = get_site_config(settings)
 
-    dictionary = set(list(get_extended_dictionary()) + list(custom_known_words))
+    article = get_article(page, settings)
 
     if article.text:
-        raw_text = u'%s. %s' % (article.title, article.text)
-        misspelled = get_misspelled_words(raw_text, language, dictionary)
+        # The page's text analysis already tokenized the title and text
+        check_words_unique = get_text_analysis(page, settings).get_check_words(config.stop_words)
+        misspelled = get_misspelled_words(
+            None, config.spelling_language, config.dictionary,
+            affix_index=config.affix_index, check_words_unique=check_words_unique
+        )
         found_misspellings = len(misspelled) > 0
         message = "No misspellings found" if not found_misspellings else u'Found %s misspelling(s): "%s"' % (len(misspelled), '", "'.join(misspelled))
-        return found_misspellings, message, {'misspelled_words': misspelled}
+        return found_misspellings, message, add_list({}, 'misspelled_words', misspelled, payload)
 
     return False, 'No article found', {}
 
@@ -43,218 +52,9 @@ def is_in_dictionary(word, dictionary):
         return (word in dictionary)
 
 
-def get_simplification_options(word):
-    suffixes = [
-        {'able': ''},
-        {'acy': ''},
-        {'ant': ''},
-        {'al': ''},
-        {'ance': ''},
-        {'ate': ''},
-        {'bed': ''},
-        {'bility': ''},
-        {'bility': 'ble'},
-        {'bio': ''},
-        {'dom': ''},
-        {'cced': 'c'},
-        {'cces': 'c'},
-        {'ccing': 'c'},
-        {'dded': 'd'},
-        {'ddes': 'd'},
-        {'dding': 'd'},
-        {'ed': ''},
-        {'ed': 'e'},
-        {'ee': ''},
-        {'en': ''},
-        {'en': 'e'},
-        {'ence': ''},
-        {'ence': 'e'},
-        {'ent': ''},
-        {'er': ''},
-        {'er': 'e'},
-        {'erizer': ''},
-        {'es': ''},
-        {'es': 'e'},
-        {'esque': ''},
-        {'est': ''},
-        {'ffed': 'f'},
-        {'ffes': 'f'},
-        {'ffing': 'f'},
-        {'ful': ''},
-        {'fy': ''},
-        {'gged': 'g'},
-        {'gges': 'g'},
-        {'gging': 'g'},
-        {'hood': ''},
-        {'ible': ''},
-        {'ic': ''},
-        {'ical': ''},
-        {'ied': ''},
-        {'ied': 'y'},
-        {'ier': ''},
-        {'ier': 'y'},
-        {'ies': ''},
-        {'ies': 'y'},
-        {'iest': ''},
-        {'iest': 'y'},
-        {'ify': ''},
-        {'ily': ''},
-        {'iness': ''},
-        {'iness': 'y'},
-        {'ing': ''},
-        {'ing': 'e'},
-        {'ious': ''},
-        {'ise': ''},
-        {'ish': ''},
-        {'ism': ''},
-        {'ist': ''},
-        {'ity': ''},
-        {'ity': 'y'},
-        {'ive': ''},
-        {'ize': ''},
-        {'izer': ''},
-        {'jjed': 'j'},
-        {'jjes': 'j'},
-        {'jjing': 'j'},
-        {'kked': 'k'},
-        {'kkes': 'k'},
-        {'kking': 'k'},
-        {'less': ''},
-        {'like': ''},
-        {'lled': 'l'},
-        {'lles': 'l'},
-        {'lling': 'l'},
-        {'long': ''},
-        {'ly': ''},
-        {'mate': ''},
-        {'ment': ''},
-        {'mmed': 'm'},
-        {'mmes': 'm'},
-        {'mming': 'm'},
-        {'ness': ''},
-        {'nned': 'n'},
-        {'nnes': 'n'},
-        {'nning': 'n'},
-        {'ologist': ''},
-        {'ologist': 'ology'},
-        {'ous': ''},
-        {'ped': ''},
-        {'pped': 'p'},
-        {'ppes': 'p'},
-        {'pping': 'p'},
-        {'qqed': 'q'},
-        {'qqes': 'q'},
-        {'qqing': 'q'},
-        {'red': ''},
-        {'red': 're'},
-        {'rred': 'r'},
-        {'rres': 'r'},
-        {'rring': 'r'},
-        {'s': ''},
-        {'sion': ''},
-        {'ssed': 's'},
-        {'sses': 's'},
-        {'ssing': 's'},
-        {'tion': ''},
-        {'tion': 'te'},
-        {'tize': ''},
-        {'tize': 'ty'},
-        {'tize': 't'},
-        {'tted': 't'},
-        {'ttes': 't'},
-        {'tting': 't'},
-        {'ty': ''},
-        {'vved': 'v'},
-        {'vves': 'v'},
-        {'vving': 'v'},
-        {'ward': ''},
-        {'wards': ''},
-        {'wide': ''},
-        {'wise': ''},
-        {'worthy': ''},
-        {'y': ''},
-        {'zzed': 'z'},
-        {'zzes': 'z'},
-        {'zzing': 'z'},
-    ]
-
-    prefixes = [
-        {'ante': ''},
-        {'anti': ''},
-        {'auto': ''},
-        {'bi': ''},
-        {'bio': ''},
-        {'bis': ''},
-        {'co': ''},
-        {'de': ''},
-        {'dis': ''},
-        {'en': ''},
-        {'ex': ''},
-        {'extra': ''},
-        {'hyper': ''},
-        {'ig': ''},
-        {'im': ''},
-        {'in': ''},
-        {'inter': ''},
-        {'ir': ''},
-        {'macro': ''},
-        {'mal': ''},
-        {'mega': ''},
-        {'micro': ''},
-        {'mini': ''},
-        {'mis': ''},
-        {'mono': ''},
-        {'multi': ''},
-        {'neo': ''},
-        {'neuro': ''},
-        {'non': ''},
-        {'omni': ''},
-        {'over': ''},
-        {'penta': ''},
-        {'per': ''},
-        {'poly': ''},
-        {'post': ''},
-        {'pre': ''},
-        {'pro': ''},
-        {'quad': ''},
-        {'re': ''},
-        {'retro': ''},
-        {'semi': ''},
-        {'socio': ''},
-        {'sub': ''},
-        {'super': ''},
-        {'tran': ''},
-        {'tri': ''},
-        {'un': ''},
-        {'under': ''},
-        {'uni': ''}
-    ]
-    # Sort prefixes and suffixes from longest to shortest
-    suffixes.sort(key=lambda s: len(next(iter(s))))
-    suffixes.reverse()
-    prefixes.sort(key=lambda s: len(next(iter(s))))
-    prefixes.reverse()
-    output = []
-
-    for prefix_item in prefixes:
-        prefix = next(iter(prefix_item))
-        if word.startswith(prefix):
-            output.append({
-                'type': 'prefix',
-                'search': prefix,
-                'replace': prefix_item[prefix]
-            })
-
-    for suffix_item in suffixes:
-        suffix = next(iter(suffix_item))
-        if word.endswith(suffix):
-            output.append({
-                'type': 'suffix',
-                'search': suffix,
-                'replace': suffix_item[suffix]
-            })
-
-    return output
+def get_simplification_options(word, affix_index=None):
+    affix_index = default_affix_index if affix_index is None else affix_index
+    return affix_index.get_options(word)
 
 
 def apply_simplification(word, simplification):
@@ -269,12 +69,34 @@ def apply_simplification(word, simplification):
     return word
 
 
-def simplify_word(word, dictionary, debug=False):
+def simplify_word(word, dictionary, debug=False, max_depth=MAX_SIMPLIFICATION_DEPTH, affix_index=None):
     log_level = logging.WARNING if debug else logging.DEBUG
+    affix_index = default_affix_index if affix_index is None else affix_index
+
+    version = get_dictionary_version(dictionary)
+    cache_key = None if (version is None or debug) else (version, affix_index.version, max_depth, word)
+    if cache_key is not None:
+        cached = simplify_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    simplified = _simplify_word(word, dictionary, affix_index, {}, max_depth, log_level)
+
+    if cache_key is not None:
+        simplify_cache.set(cache_key, simplified)
+    return simplified
 
+
+def _simplify_word(word, dictionary, affix_index, explored, depth, log_level):
+    """
+    Depth-first search over prefix and suffix removals, returning the first
+    dictionary word found. explored maps each stem already searched (without
+    success) to the depth it was searched with, so shared stems are only
+    expanded once.
+    """
     logger.log(log_level, u"\n--------- Simplifying %s ---------" % (word))
 
-    possible_simplifications = get_simplification_options(word)
+    possible_simplifications = affix_index.get_options(word)
     logger.log(log_level, "Possible simplifications: %s " % (possible_simplifications))
 
     if len(possible_simplifications) == 0:
@@ -289,146 +111,277 @@ def simplify_word(word, dictionary, debug=False):
             logger.log(log_level, "Simplification yielded valid word %s" % (applied))
             return applied
 
-        else:
-            drilled_down = simplify_word(applied, dictionary, debug)
-            if is_in_dictionary(drilled_down, dictionary):
-                logger.log(log_level, "Drilled down yielded valid word %s" % (drilled_down))
-                return drilled_down
+        if depth <= 1 or explored.get(applied, 0) >= depth - 1:
+            continue
+        explored[applied] = depth - 1
+
+        drilled_down = _simplify_word(applied, dictionary, affix_index, explored, depth - 1, log_level)
+        if is_in_dictionary(drilled_down, dictionary):
+            logger.log(log_level, "Drilled down yielded valid word %s" % (drilled_down))
+            return drilled_down
     return word
 
 
+EMAIL_PATTERN = r"\S*@\S*\s?"
+HASH_PATTERN = r"#(?:\w+)"
+PHONENUMBER_PATTERN = r"(?:\d{1,3}[-\.\s]??\d{3}[-\.\s]??\d{3}[-\.\s]??\d{4}|\(\d{3}\)\s*\d{3}[-\.\s]??\d{4}|\d{3}[-\.\s]??\d{4})"
+FULL_LINK_PATTERN = r'(?:http|https|ftp|telnet):\/\/[\w\-_]+(?:\.[\w\-_]+)+(?:[\w\-\.,@?^=%&amp;:/~\+#]*[\w\-\@?^=%&amp;/~\+#])?'
+PARTIAL_LINK_PATTERN = r"(?:[\w\.]+\.(?:com|org|net|us|co|edu|gov|uk)[^,\s]*)"
+MAILTO_PATTERN = r'(?:(?:mailto\:|(?:news|(?:ht|f)tp(?:s?))\://){1}\S+)'
+IP_PATTERN = r"\b\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b"
+INTL_TEL_PATTERN = r'(?:tel):(?:\+[0-9]+\s*)?(?:\([0-9]+\))?[\s0-9\-]+[0-9]+'
+US_TEL_PATTERN = r"(?:tel):(?:\d{3}[-\.\s]??\d{3}[-\.\s]??\d{4}|\(\d{3}\)\s*\d{3}[-\.\s]??\d{4}|\d{3}[-\.\s]??\d{4})"
+FILENAME_PATTERN = r"(?:[\w\d\-.]+\.(?:pdf|PDF|doc|DOC|docx|DOCX|zip|ZIP|xlsx|XLSX|csv|CSV))"
+ACRONYM_PATTERN = r"\b[A-Z\.]{2,}s?\b"
+
+email_re = re.compile(EMAIL_PATTERN)
+hash_re = re.compile(HASH_PATTERN)
+phonenumber_re = re.compile(PHONENUMBER_PATTERN)
+url_res = [re.compile(pattern) for pattern in [
+    FULL_LINK_PATTERN, PARTIAL_LINK_PATTERN, MAILTO_PATTERN, IP_PATTERN,
+    INTL_TEL_PATTERN, US_TEL_PATTERN, FILENAME_PATTERN
+]]
+acronym_re = re.compile(ACRONYM_PATTERN)
+
+# The patterns above in one alternation, used to tell whether a stretch of
+# text holds anything to scrub at all. Acronyms are removed later, after
+# contractions are expanded (see get_check_words).
+scrub_re = re.compile(u"|".join([
+    FULL_LINK_PATTERN, MAILTO_PATTERN, INTL_TEL_PATTERN, US_TEL_PATTERN,
+    PARTIAL_LINK_PATTERN, IP_PATTERN, FILENAME_PATTERN, EMAIL_PATTERN,
+    HASH_PATTERN, PHONENUMBER_PATTERN
+]))
+
+# Every match needs a digit or one of @#.: and only spans words holding one
+# of those or a dash, so the scrubber only looks at stretches of such words;
+# plain words are skipped without trying each pattern at every character.
+scrub_candidate_re = re.compile(r"(?<!\S)\S*[\d@#.:\-]\S*(?:\s+\S*[\d@#.:\-]\S*)*")
+
+# Words are separated by spaces, tabs and zero-width spaces
+token_re = re.compile(u"[^ \t\u200b]+")
+
+# Fancy typographic characters like curly quotes and em dashes are normalized,
+# while hyphens, slashes and newlines become word breaks.
+typographic_translation_table = dict([(ord(x), ord(y)) for x, y in zip(u"‘’´'“”–-—⁃‐…●•∙©/\n\r", u"''''\"\"     .       ")])
+
+
 def remove_emails(input):
-    return re.sub(r"\S*@\S*\s?", " ", input)
+    return email_re.sub(" ", input)
 
 
 def remove_hashes(input):
-    return re.sub(r"#(\w+)", " ", input)
+    return hash_re.sub(" ", input)
 
 
 def remove_phonenumbers(input):
     # TODO
     # intl_removed = re.sub(r'(\+[0-9]+\s*)?(\([0-9]+\))?[\s0-9\-]+[0-9]+', ' ', input)
-    # intl_removed = input
-    intl_removed = re.sub(r"(\d{1,3}[-\.\s]??\d{3}[-\.\s]??\d{3}[-\.\s]??\d{4}|\(\d{3}\)\s*\d{3}[-\.\s]??\d{4}|\d{3}[-\.\s]??\d{4})", " ", input)
-    us_removed = re.sub(r"(\d{1,3}[-\.\s]??\d{3}[-\.\s]??\d{3}[-\.\s]??\d{4}|\(\d{3}\)\s*\d{3}[-\.\s]??\d{4}|\d{3}[-\.\s]??\d{4})", " ", intl_removed)
-
-    return us_removed
+    return phonenumber_re.sub(" ", input)
 
 
 def remove_urls(input):
-    # return re.sub(r'\s*(?:https?://)?\S*\.[A-Za-z]{2,5}\s*', " ", input)
-    removed_full_links = re.sub(r'(http|https|ftp|telnet):\/\/[\w\-_]+(\.[\w\-_]+)+([\w\-\.,@?^=%&amp;:/~\+#]*[\w\-\@?^=%&amp;/~\+#])?', " ", input)
-    remove_partial_links = re.sub(r"([\w\.]+\.(?:com|org|net|us|co|edu|gov|uk)[^,\s]*)", " ", removed_full_links)
-    remove_mailtos = re.sub(r'((mailto\:|(news|(ht|f)tp(s?))\://){1}\S+)', " ", remove_partial_links)
-    ips_removed = re.sub(r"\b\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b", " ", remove_mailtos)
-    intl_removed = re.sub(r'(tel):(\+[0-9]+\s*)?(\([0-9]+\))?[\s0-9\-]+[0-9]+', ' ', ips_removed)
-    us_removed = re.sub(r"(tel):(\d{3}[-\.\s]??\d{3}[-\.\s]??\d{4}|\(\d{3}\)\s*\d{3}[-\.\s]??\d{4}|\d{3}[-\.\s]??\d{4})", " ", intl_removed)
-    filenames_removed = re.sub(r"([\w\d\-.]+\.(pdf|PDF|doc|DOC|docx|DOCX|zip|ZIP|xlsx|XLSX|csv|CSV))", " ", us_removed)
-    return filenames_removed
+    for url_re in url_res:
+        input = url_re.sub(" ", input)
+    return input
 
 
 def remove_acronyms(input):
-    return re.sub(r"\b[A-Z\.]{2,}s?\b", "", input)
+    return acronym_re.sub("", input)
+
+
+def _scrub_candidate(match):
+    # Most stretches hold nothing to scrub. The rest go through each removal
+    # in turn, since matches from one pass can overlap those of the next and
+    # the earlier pass has to win (an email's \S*@ would otherwise eat the
+    # words glued to a link before it).
+    candidate = match.group(0)
+    if scrub_re.search(candidate) is None:
+        return candidate
+    return remove_phonenumbers(remove_hashes(remove_emails(remove_urls(candidate))))
+
+
+def scrub_text(input):
+    """
+    Removes urls, emails, hashes, ip addresses, filenames and phone numbers,
+    leaving the same words as running each removal over the whole text.
+    """
+    return scrub_candidate_re.sub(_scrub_candidate, input)
 
 
 def remove_direct_quotation_brackets(input):
     return input.replace("[", "").replace("]", "")
 
 
-def get_misspelled_words(raw_text, language, dictionary, debug=False):
+def iter_check_words(text, stop_words):
+    """
+    Yields candidate words from text, skipping stopwords, numbers and
+    punctuation-only tokens.
+    """
+    for match in token_re.finditer(text):
+        word = match.group(0)
+        if word.lower() in stop_words:
+            continue
+
+        # Remove any numbers and punctuation
+        word = unicodedata.normalize('NFKC', word)
+        if word[0].isdigit():
+            continue
+        word = remove_direct_quotation_brackets(word.strip(punctuation))
+        # Apply twice in case there is punctuation around digits
+        if not word or word[0].isdigit():
+            continue
+        word = remove_direct_quotation_brackets(word.strip(punctuation))
+        if word:
+            yield word
+
+
+def get_word_verdicts(words, language, dictionary, affix_index=None, debug=False):
+    """
+    Returns {word: verdict} for lowercase words, where the verdict is one of
+    KNOWN, PROPER_NOUN or MISSPELLED:root (see utils/verdicts.py). Verdicts
+    only depend on the word, language, dictionary, affix rules and spell
+    checker, so they are cached for every page checked with the same site
+    settings.
+    """
+    affix_index = default_affix_index if affix_index is None else affix_index
+    version = get_dictionary_version(dictionary)
+    cache = None if (version is None or debug) else get_word_verdict_cache()
+
+    verdicts = {}
+    if cache is not None:
+        checker_version = get_checker_version(get_language_resources(language).spell_checker)
+        scope = get_verdict_scope(language, version, affix_index.version, checker_version)
+        verdicts = cache.get_many(scope, words)
+    cached = set(verdicts)
+    increment('spelling.verdict_cache_hit', len(cached))
+    increment('spelling.verdict_cache_miss', len(words) - len(cached))
+
+    # First check the corpus dictionary, then simplify to a root word
+    roots = {}
+    with timer('spelling.simplify'):
+        for word in words:
+            if word in verdicts:
+                continue
+            if is_in_dictionary(word, dictionary):
+                verdicts[word] = KNOWN
+                continue
+            root = simplify_word(word, dictionary, affix_index=affix_index)
+            if is_in_dictionary(root, dictionary):
+                verdicts[word] = KNOWN
+            else:
+                roots[word] = root
+
+    # Finally use the spelling library on whatever is left
+    if roots:
+        with timer('spelling.spell_checker'):
+            unknown_words = get_language_resources(language).spell_checker.unknown(list(roots))
+        for word, root in roots.items():
+            if word in unknown_words:
+                verdicts[word] = misspelled_verdict(root)
+            else:
+                verdicts[word] = PROPER_NOUN
+
+    if cache is not None:
+        cache.set_many(scope, dict((word, verdict) for word, verdict in verdicts.items() if word not in cached))
+    return verdicts
+
+
+def get_check_words(raw_text, stop_words=None, debug=False):
+    """
+    Returns the distinct candidate words of raw_text, in order of appearance,
+    after removing urls, emails, acronyms, contractions and stopwords
+    (English ones unless stop_words is given).
+    """
     log_level = logging.WARNING if debug else logging.DEBUG
 
-    # if language != 'en':
-    #     return True, 'Language "%s" not supported' % (language)
-
     logger.log(log_level, ">> raw_text:")
     logger.log(log_level, raw_text)
 
     # Remove email addresses, hashes, urls, phone numbers...
-    urls_removed = remove_urls(raw_text)
-    emails_removed = remove_emails(urls_removed)
-    hashes_removed = remove_hashes(emails_removed)
-    phonenumbers_removed = remove_phonenumbers(hashes_removed)
+    with timer('spelling.scrub'):
+        scrubbed = scrub_text(raw_text)
 
     logger.log(log_level, ">> after email, hashes, urls, phone numbers removed:")
-    logger.log(log_level, phonenumbers_removed)
+    logger.log(log_level, scrubbed)
 
-    # Replace fancy typigraphic characters like curly quotes and em dashes
-    typographic_translation_table = dict([(ord(x), ord(y)) for x, y in zip(u"‘’´'“”–-—⁃‐…●•∙©", u"''''\"\"-----.----")])
-    typography_removed = phonenumbers_removed.translate(typographic_translation_table)
-    hyphens_removed = typography_removed.replace("-", " ").replace("/", " ")
-    newlines_removed = hyphens_removed.replace("\n", " ").replace("\r", " ")
+    # Replace fancy typigraphic characters, hyphens, slashes and newlines
+    newlines_removed = scrubbed.translate(typographic_translation_table)
 
     logger.log(log_level, ">> after fancy typographic characters and newlines removed:")
     logger.log(log_level, newlines_removed)
 
-    contractions_removed = contractions.fix(newlines_removed)
+    with timer('spelling.contractions'):
+        contractions_removed = contractions.fix(newlines_removed)
     possessives_removed = re.sub("\'s ", " ", contractions_removed)
     hyphens_removed = possessives_removed.replace("-", " ")
+    # Only after contractions are expanded, so "ISN'T" doesn't leave "'T" behind
     acronyms_removed = remove_acronyms(hyphens_removed)
-    whitespace_condensed = re.sub("[ \t]+", " ", acronyms_removed.replace(u'\u200b', ' '))
 
     logger.log(log_level, ">> after contractions, posessives, hyphens and acronyms removed:")
-    logger.log(log_level, whitespace_condensed)
-
-    # Split text into words
-    check_words_raw = whitespace_condensed.split(' ')
-    logger.log(log_level, ">> check_words_raw:")
-    logger.log(log_level, check_words_raw)
-
-    # Remove stopwords for faster processing
-    stop_words = set(stopwords.words('english'))
-    stopwords_removed = [word for word in check_words_raw if (word.lower() not in stop_words)]
-    logger.log(log_level, ">> stopwords_removed:")
-    logger.log(log_level, stopwords_removed)
+    logger.log(log_level, acronyms_removed)
+
+    # Tokenize, filter and normalize lazily, keeping one copy of each word
+    stop_words = get_language_resources('en').stop_words if stop_words is None else stop_words
+    token_count = 0
+    check_words_unique = {}
+    with timer('spelling.tokenize'):
+        for word in iter_check_words(acronyms_removed, stop_words):
+            check_words_unique[word] = None
+            token_count += 1
+    increment('spelling.tokens', token_count)
+    increment('spelling.unique_words', len(check_words_unique))
+    logger.log(log_level, ">> check_words_unique:")
+    logger.log(log_level, list(check_words_unique))
+
+    return list(check_words_unique)
+
+
+def get_misspelled_words(raw_text, language, dictionary, debug=False, affix_index=None, stop_words=None, check_words_unique=None):
+    """
+    Pass check_words_unique (see get_check_words) to skip tokenizing raw_text again
+    """
+    log_level = logging.WARNING if debug else logging.DEBUG
 
-    # Remove any numbers and punctuation
-    normalzized_words = [unicodedata.normalize('NFKC', word) for word in stopwords_removed]
-    punctuation_removed = [remove_direct_quotation_brackets(word.strip(punctuation)) for word in normalzized_words if (word and not word[0].isdigit())]
-    # Apply twice in case there is punctuation around digits
-    punctuation_removed = [remove_direct_quotation_brackets(word.strip(punctuation)) for word in punctuation_removed if (word and not word[0].isdigit())]
+    # if language != 'en':
+    #     return True, 'Language "%s" not supported' % (language)
 
-    logger.log(log_level, ">> punctuation_removed:")
-    logger.log(log_level, punctuation_removed)
+    if check_words_unique is None:
+        if stop_words is None:
+            stop_words = get_language_resources(language).stop_words
+        check_words_unique = get_check_words(raw_text, stop_words, debug)
 
-    remove_empty_words = [word for word in punctuation_removed if word]
+    # Each distinct word is analysed once per dictionary; see get_word_verdicts
+    with timer('spelling.verdicts'):
+        verdicts = get_word_verdicts(
+            dict.fromkeys(word.lower() for word in check_words_unique), language, dictionary,
+            affix_index=affix_index, debug=debug
+        )
+    logger.log(log_level, ">> verdicts:")
+    logger.log(log_level, verdicts)
 
     # Gather list of assumed proper nouns.
     # Assume anything capitalized in article is a local proper noun
-    proper_nouns = []
-    for word in remove_empty_words:
-        if word[0].isupper() and not is_in_dictionary(simplify_word(word.lower(), dictionary), dictionary):
-            proper_nouns.append(word.strip(punctuation))
-    proper_nouns_lower = [word.lower() for word in proper_nouns]
+    with timer('spelling.proper_nouns'):
+        proper_nouns = []
+        for word in check_words_unique:
+            if word[0].isupper() and verdicts[word.lower()] != KNOWN:
+                proper_nouns.append(word.strip(punctuation))
+        proper_nouns_lower = set(word.lower() for word in proper_nouns)
     logger.log(log_level, ">> proper_nouns:")
     logger.log(log_level, proper_nouns)
 
     # Remove anything matching a proper noun from above
-    remove_proper_nounds = [item for item in remove_empty_words if item.lower() not in proper_nouns_lower]
-
-    # Reduce to unique set of words
-    check_words = list(set(remove_proper_nounds))
+    check_words = [word for word in check_words_unique if word.lower() not in proper_nouns_lower]
     logger.log(log_level, ">> check_words:")
     logger.log(log_level, check_words)
 
-    # First check the corpus dictionary:
-    words_not_in_dict = [word for word in check_words if not is_in_dictionary(word.lower(), dictionary)]
-    logger.log(log_level, ">> words_not_in_dict:")
-    logger.log(log_level, words_not_in_dict)
-
-    # Next use spelling library
-    spell = SpellChecker(language=language, distance=1)
-    unknown = [item for item in list(spell.unknown(words_not_in_dict))]
-    logger.log(log_level, ">> unknown:")
-    logger.log(log_level, unknown)
-
-    # Finally, removing prefix and suffixes to unearth a valid root word
     misspelled = []
-    for word in unknown:
-        simplified_word = simplify_word(word, dictionary)
-        if not is_in_dictionary(simplified_word, dictionary):
-            misspelled.append(simplified_word)
+    for word in dict.fromkeys(word.lower() for word in check_words):
+        root = get_misspelled_root(verdicts[word])
+        if root is not None:
+            misspelled.append(root)
 
+    increment('spelling.misspelled', len(misspelled))
     logger.log(log_level, ">> misspelled:")
     logger.log(log_level, misspelled)
 
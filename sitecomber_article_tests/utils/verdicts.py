@@ -0,0 +1,145 @@
+import os
+import hashlib
+import logging
+
+from .cache import LRUCache
+
+
+logger = logging.getLogger('django')
+
+KNOWN = u'known'
+# Not a dictionary word, but known to the spell checker: a proper noun when
+# capitalized, a correctly spelled word otherwise
+PROPER_NOUN = u'proper_noun'
+MISSPELLED = u'misspelled'
+
+# Bump VERDICT_FORMAT_VERSION whenever the spelling pipeline changes so that
+# verdicts stored in a shared backend are ignored.
+VERDICT_FORMAT_VERSION = 1
+WORD_VERDICT_CACHE_SIZE = 100000
+DEFAULT_TIMEOUT = 24 * 60 * 60
+
+
+def misspelled_verdict(root):
+    return u"%s:%s" % (MISSPELLED, root)
+
+
+def get_misspelled_root(verdict):
+    """
+    Returns the simplified root of a misspelled verdict, or None.
+    """
+    if verdict.startswith(MISSPELLED + u":"):
+        return verdict[len(MISSPELLED) + 1:]
+    return None
+
+
+def get_verdict_scope(language, dictionary_version, affix_version, checker_version=None):
+    """
+    Verdicts only hold for one language, dictionary, set of affix rules and
+    spell checker (see checkers.get_checker_version); sites with the same
+    settings share a scope.
+    """
+    scope = repr((VERDICT_FORMAT_VERSION, language, dictionary_version, affix_version, checker_version))
+    return hashlib.sha1(scope.encode('utf-8')).hexdigest()
+
+
+class DjangoCacheVerdictBackend(object):
+    """
+    Shares verdicts between worker processes through a Django cache
+    (memcached, redis, database, ...).
+    """
+
+    def __init__(self, alias='default', timeout=DEFAULT_TIMEOUT):
+        self.alias = alias
+        self.timeout = timeout
+
+    @property
+    def cache(self):
+        from django.core.cache import caches
+        return caches[self.alias]
+
+    def make_key(self, scope, word):
+        # Hashed so that any word makes a valid memcached key
+        return u"sitecomber_article_tests:verdict:%s:%s" % (scope, hashlib.sha1(word.encode('utf-8')).hexdigest())
+
+    def get_many(self, scope, words):
+        keys = dict((self.make_key(scope, word), word) for word in words)
+        try:
+            found = self.cache.get_many(list(keys))
+        except Exception as e:
+            logger.error(u"Error reading word verdicts from cache %s: %s" % (self.alias, e))
+            return {}
+        return dict((keys[key], verdict) for key, verdict in found.items())
+
+    def set_many(self, scope, verdicts):
+        try:
+            self.cache.set_many(
+                dict((self.make_key(scope, word), verdict) for word, verdict in verdicts.items()),
+                timeout=self.timeout
+            )
+        except Exception as e:
+            logger.error(u"Error writing word verdicts to cache %s: %s" % (self.alias, e))
+
+
+class WordVerdictCache(object):
+    """
+    Per-process LRU of word verdicts, optionally backed by a shared backend.
+    """
+
+    def __init__(self, maxsize=WORD_VERDICT_CACHE_SIZE, backend=None):
+        self.local = LRUCache(maxsize)
+        self.backend = backend
+
+    def get_many(self, scope, words):
+        verdicts = {}
+        missing = []
+        for word in words:
+            verdict = self.local.get((scope, word))
+            if verdict is None:
+                missing.append(word)
+            else:
+                verdicts[word] = verdict
+
+        if missing and self.backend is not None:
+            shared = self.backend.get_many(scope, missing)
+            for word, verdict in shared.items():
+                self.local.set((scope, word), verdict)
+            verdicts.update(shared)
+        return verdicts
+
+    def set_many(self, scope, verdicts):
+        for word, verdict in verdicts.items():
+            self.local.set((scope, word), verdict)
+        if verdicts and self.backend is not None:
+            self.backend.set_many(scope, verdicts)
+
+    def clear(self):
+        self.local.clear()
+
+    def info(self):
+        return self.local.info()
+
+
+word_verdict_cache = WordVerdictCache()
+
+
+def configure_word_verdict_cache(alias=None, timeout=DEFAULT_TIMEOUT, maxsize=WORD_VERDICT_CACHE_SIZE):
+    """
+    Share verdicts through the Django cache named alias, or keep them in this
+    process only if alias is None.
+    """
+    global word_verdict_cache
+    backend = None if not alias else DjangoCacheVerdictBackend(alias, timeout)
+    word_verdict_cache = WordVerdictCache(maxsize, backend)
+    return word_verdict_cache
+
+
+def get_word_verdict_cache():
+    return word_verdict_cache
+
+
+if os.environ.get('SITECOMBER_WORD_VERDICT_CACHE'):
+    configure_word_verdict_cache(
+        os.environ['SITECOMBER_WORD_VERDICT_CACHE'],
+        int(os.environ.get('SITECOMBER_WORD_VERDICT_CACHE_TIMEOUT', DEFAULT_TIMEOUT))
+    )
@@ -0,0 +1,79 @@
+import sys
+import time
+import logging
+import importlib
+
+
+logger = logging.getLogger('django')
+
+# Third-party dependencies first, so each analyzer module's time is its own
+WARMUP_MODULES = [
+    'nltk',
+    'lxml.html',
+    'newspaper',
+    'spellchecker',
+    'contractions',
+    'ahocorasick',
+    'readtime',
+    'sitecomber_article_tests.utils.article',
+    'sitecomber_article_tests.utils.spelling',
+    'sitecomber_article_tests.utils.seo',
+]
+
+
+def timed(report, component, function, *args):
+    """
+    Runs function, recording how long it took and, instead of raising, any
+    error; the component then loads again on first use
+    """
+    start = time.perf_counter()
+    result = error = None
+    try:
+        result = function(*args)
+    except Exception as e:
+        error = u"%s: %s" % (e.__class__.__name__, e)
+        logger.error(u"Could not warm up %s: %s" % (component, error))
+    report.append((component, time.perf_counter() - start, error))
+    return result
+
+
+def warm_up(languages=('en',)):
+    """
+    Imports the analyzers' dependencies and loads each language's stopwords,
+    lexicon, affix rules and spell checker ahead of the first page.
+    Returns a list of (component, seconds, error); components that were
+    already loaded report close to zero. Warm-up is best-effort: a component
+    that fails is reported with its error, and the rest still load.
+    """
+    report = []
+    for module_name in WARMUP_MODULES:
+        timed(report, u"import %s" % (module_name), importlib.import_module, module_name)
+
+    from .dictionary import get_dictionary_version
+    from .languages import get_language_resources
+
+    for language in languages:
+        resources = get_language_resources(language)
+        timed(report, u"stopwords (%s)" % (language), getattr, resources, 'stop_words')
+        lexicon = timed(report, u"lexicon (%s)" % (language), getattr, resources, 'lexicon')
+        timed(report, u"lexicon version (%s)" % (language), get_dictionary_version, lexicon)
+        timed(report, u"affix rules (%s)" % (language), getattr, resources, 'affix_index')
+        timed(report, u"spell checker (%s)" % (language), getattr, resources, 'spell_checker')
+
+    logger.debug(u"Warmed up article tests in %.3fs" % (sum(seconds for component, seconds, error in report)))
+    return report
+
+
+def format_report(report):
+    lines = []
+    for component, seconds, error in report:
+        line = u"%-48s %9.1f ms" % (component, seconds * 1000)
+        lines.append(line if error is None else u"%s  failed: %s" % (line, error))
+    lines.append(u"%-48s %9.1f ms" % (u"total", sum(seconds for component, seconds, error in report) * 1000))
+    return u"\n".join(lines)
+
+
+if __name__ == '__main__':
+    from .languages import format_resident_languages
+    print(format_report(warm_up(sys.argv[1:] or ['en'])))
+    print(format_resident_languages())
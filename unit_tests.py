@@ -6,6 +6,30 @@ sys.path.append(BASE_DIR)
 
 from sitecomber_article_tests.unit_tests.spelling import test as spelling_test
 from sitecomber_article_tests.unit_tests.placeholder import test as placeholder_test
+from sitecomber_article_tests.unit_tests.article import test as article_test
+from sitecomber_article_tests.unit_tests.lexicon import test as lexicon_test
+from sitecomber_article_tests.unit_tests.seo import test as seo_test
+from sitecomber_article_tests.unit_tests.config import test as config_test
+from sitecomber_article_tests.unit_tests.metrics import test as metrics_test
+from sitecomber_article_tests.unit_tests.payload import test as payload_test
+from sitecomber_article_tests.unit_tests.languages import test as languages_test
+from sitecomber_article_tests.unit_tests.article_store import test as article_store_test
+from sitecomber_article_tests.unit_tests.batching import test as batching_test
+from sitecomber_article_tests.unit_tests.warmup import test as warmup_test
+from sitecomber_article_tests.unit_tests.aio import test as aio_test
+from sitecomber_article_tests.unit_tests.fingerprints import test as fingerprints_test
 
 placeholder_test()
+article_test()
+lexicon_test()
+seo_test()
+config_test()
+metrics_test()
+payload_test()
+languages_test()
+article_store_test()
+batching_test()
+warmup_test()
+aio_test()
+fingerprints_test()
 spelling_test()